@@ -1,16 +1,18 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
+import asyncio
+import base64
+import hashlib
+import hmac
+import math
 import time
 from typing import Optional
 
-from utils.config_loader import get_config
-from utils.database import (
-    set_ticket, get_ticket, delete_ticket,
-    add_to_total, get_total, is_blacklisted,
-)
-from utils.fees import calculate_fee
-from utils.transcript import create_transcript
+from utils import async_database as db
+from utils import capture, categories, close_jobs, ledger, permissions, rollups, scheduler, transcript_delivery
+from utils.config_loader import get_config, settings
+from utils.fees import calculate_fee, fee_table_rows
 
 # ── Constants ──────────────────────────────────────────────────────────────────
 
@@ -29,68 +31,55 @@ METHOD_EMOJI = {
     "Bank Transfer": "🏦", "Wunschgutschein": "🎁",
 }
 
-# Per-user wizard state
-PENDING: dict[int, dict] = {}
+# ── Shared helpers ─────────────────────────────────────────────────────────────
 
+# Discord allows ~2 channel renames per 10 minutes, so closes only flag the
+# total as stale and a background task renames at most once per interval.
+_total_dirty = asyncio.Event()
 
-# ── Shared helpers ─────────────────────────────────────────────────────────────
 
-async def update_total_voice(bot: commands.Bot):
-    cfg = get_config()
-    ch_id = cfg.get("total-exchanged-voice-id")
-    if not ch_id:
-        return
-    channel = bot.get_channel(int(ch_id))
-    if channel:
-        try:
-            await channel.edit(name=f"💱 Total: €{get_total():,.2f}")
-        except Exception:
-            pass
+def update_total_voice():
+    _total_dirty.set()
 
 
-async def do_send_transcript(bot: commands.Bot, channel: discord.TextChannel, ticket_data: dict):
-    cfg = get_config()
-    try:
-        filepath = await create_transcript(channel, ticket_data)
-        status   = ticket_data.get("status", "unknown").capitalize()
-        color    = discord.Color.green() if status.lower() == "completed" else discord.Color.red()
-
-        log_emb = discord.Embed(
-            title=f"📋 Transcript — #{channel.name}",
-            description=f"**Status:** {status}",
-            color=color,
-            timestamp=discord.utils.utcnow(),
-        )
-        log_emb.set_footer(text="Exchora Exchange • .gg/Exchora")
+async def _total_voice_loop(bot: commands.Bot):
+    await bot.wait_until_ready()
+    last = float("-inf")
+    while True:
+        await _total_dirty.wait()
+        interval = float(get_config().get("total-voice-update-interval", 300))
+        wait = last + interval - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        _total_dirty.clear()
+
+        ch_id = get_config().get("total-exchanged-voice-id")
+        channel = bot.get_channel(int(ch_id)) if ch_id else None
+        if not channel:
+            continue
+        try:
+            name = f"💱 Total: {ledger.format_cents(await db.run_io(ledger.total_cents))}"
+            if channel.name == name:
+                continue
+            await scheduler.run(lambda: channel.edit(name=name), f"channel:{channel.id}",
+                                scheduler.PRIORITY_HOUSEKEEPING)
+        except Exception as e:
+            print(f"[Total Voice Error] {e}")
+        last = time.monotonic()
 
-        log_ch_id = cfg.get("exchange-logs-channel-id")
-        if log_ch_id:
-            log_ch = bot.get_channel(int(log_ch_id))
-            if log_ch:
-                await log_ch.send(embed=log_emb, file=discord.File(str(filepath), filename=filepath.name))
 
-        uid = ticket_data.get("user_id")
-        if uid:
-            try:
-                user = bot.get_user(int(uid)) or await bot.fetch_user(int(uid))
-                dm_emb = discord.Embed(
-                    title="📋 Your Exchange Ticket Transcript",
-                    description=(
-                        f"Your ticket **#{channel.name}** has been closed.\n"
-                        f"**Status:** {status}\n\nThe full transcript is attached."
-                    ),
-                    color=color,
-                    timestamp=discord.utils.utcnow(),
-                )
-                dm_emb.set_footer(text="Exchora Exchange • .gg/Exchora")
-                await user.send(embed=dm_emb, file=discord.File(str(filepath), filename=filepath.name))
-            except (discord.Forbidden, discord.NotFound):
-                pass
+async def do_send_transcript(bot: commands.Bot, channel: discord.TextChannel, ticket_data: dict,
+                             closed_ts: Optional[float] = None):
+    try:
+        from utils.transcript import create_transcript  # rendering is only loaded once a ticket closes
+        entry = await create_transcript(channel, ticket_data, closed_ts)
     except Exception as e:
         print(f"[Transcript Error] {e}")
+        raise  # the close worker retries the stage; the capture log is kept until then
+    await transcript_delivery.deliver(bot, entry)
 
 
-def _close_log_embed(ticket, closed_by, amt, reason):
+def _close_log_embed(ticket, closed_by_id, amt, reason):
     color  = discord.Color.green() if amt else discord.Color.red()
     status = "✅ Completed" if amt else "❌ Cancelled"
     send_s = ticket["send_method"] + (f" ({ticket['send_detail']})"    if ticket.get("send_detail")    else "")
@@ -112,72 +101,313 @@ def _close_log_embed(ticket, closed_by, amt, reason):
         emb.add_field(name="💰 Amount", value="Not completed", inline=True)
     emb.add_field(name="📋 Status",    value=status,            inline=True)
     emb.add_field(name="📝 Reason",    value=reason,            inline=True)
-    emb.add_field(name="👮 Closed By", value=closed_by.mention, inline=True)
+    emb.add_field(name="👮 Closed By", value=f"<@{closed_by_id}>", inline=True)
     emb.set_footer(text="Exchora Exchange • .gg/Exchora")
     return emb
 
 
-async def _do_close(bot, channel, guild, ticket, closed_by, amt, reason):
-    cfg = get_config()
+# ── Close pipeline ─────────────────────────────────────────────────────────────
+# A close is persisted as a job (utils.close_jobs) and run stage by stage by
+# background workers, so the interaction returns at once and a crash or
+# restart resumes the close from the last finished stage.
+
+_close_queue: Optional[asyncio.Queue] = None
+_close_failures: dict[int, int] = {}
+
+
+async def _do_close(bot, channel, guild, ticket, closed_by, amt, reason, enqueue: bool = True):
+    """Record the close as a job and hand it to the close workers
+    (enqueue=False: the caller runs it with _run_close_job itself)."""
     if amt:
         fd = calculate_fee(ticket["send_method"], ticket.get("send_detail"),
                            ticket["receive_method"], ticket.get("receive_detail"), amt)
         ticket.update(amount=amt, fee=fd["fee"], receive_amount=fd["receive"], fee_percent=fd["percent"])
-
     ticket["status"] = "completed" if amt else "cancelled"
-    set_ticket(channel.id, ticket)
 
-    await do_send_transcript(bot, channel, ticket)
+    await db.run_io(close_jobs.create, {
+        "channel_id": channel.id, "guild_id": guild.id, "closed_by": closed_by.id,
+        "amount": amt, "reason": reason, "ticket": ticket, "closed_at": time.time(),
+    })
+    await db.set_ticket(channel.id, ticket)
+    if enqueue:
+        _close_queue.put_nowait(channel.id)
 
-    log_ch_id = cfg.get("exchange-logs-channel-id")
-    if log_ch_id:
-        log_ch = bot.get_channel(int(log_ch_id))
-        if log_ch:
-            await log_ch.send(embed=_close_log_embed(ticket, closed_by, amt, reason))
 
-    if amt:
-        add_to_total(amt)
-        await update_total_voice(bot)
+async def _close_stage_transcript(bot, job, guild, channel):
+    if channel:
+        await do_send_transcript(bot, channel, job["ticket"], job["closed_at"])
+
+
+async def _close_stage_log(bot, job, guild, channel):
+    log_ch_id = get_config().get("exchange-logs-channel-id")
+    log_ch    = bot.get_channel(int(log_ch_id)) if log_ch_id else None
+    if log_ch:
+        emb = _close_log_embed(job["ticket"], job["closed_by"], job["amount"], job["reason"])
+        await scheduler.run(lambda: log_ch.send(embed=emb), f"messages:{log_ch.id}",
+                            scheduler.PRIORITY_HOUSEKEEPING)
 
-    cat_id = cfg.get("completed-exchanges-category-id") if amt else cfg.get("cancelled-exchanges-category-id")
-    if cat_id:
-        cat = guild.get_channel(int(cat_id))
-        if cat:
-            try:
-                await channel.edit(category=cat)
-            except Exception:
-                pass
 
-    uid = ticket.get("user_id")
-    if uid:
-        member = guild.get_member(int(uid))
+async def _close_stage_ledger(bot, job, guild, channel):
+    ticket, amt, cid = job["ticket"], job["amount"], job["channel_id"]
+    if amt and not await db.run_io(ledger.has_channel, cid):
+        await db.run_io(ledger.record, job["closed_at"], cid, ticket["user_id"], ticket.get("claimed_by"),
+                        ticket["send_method"], ticket["receive_method"],
+                        amt, ticket["fee"], ticket["receive_amount"])
+        await db.add_to_total(amt)
+        update_total_voice()
+    await db.run_io(rollups.record, job["closed_at"], ticket["status"], ticket["send_method"],
+                    ticket.get("claimed_by"), ledger.to_cents(amt) if amt else 0,
+                    ledger.to_cents(ticket["fee"]) if amt else 0)
+
+
+async def _close_stage_channel(bot, job, guild, channel):
+    if not channel:
+        return
+    cfg    = get_config()
+    cat_id = cfg.get("completed-exchanges-category-id") if job["amount"] else cfg.get("cancelled-exchanges-category-id")
+    uid    = job["ticket"].get("user_id")
+    member = guild.get_member(int(uid)) if uid else None
+
+    async with categories.slot(guild, cat_id) as cat:
+        jobs = []
+        if cat and channel.category_id != cat.id:
+            jobs.append(scheduler.submit(lambda: channel.edit(category=cat), f"channel:{channel.id}",
+                                         awaited=True))
         if member:
-            try:
-                await channel.set_permissions(member, view_channel=False)
-            except Exception:
-                pass
+            jobs.append(scheduler.submit(lambda: channel.set_permissions(member, view_channel=False),
+                                         f"permissions:{channel.id}", awaited=True))
+        results = await asyncio.gather(*jobs, return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception) and _close_error_is_transient(result, channel):
+            raise result  # retried by the close worker; the finished edits are no-ops then
+
+
+def _close_error_is_transient(e: Exception, channel) -> bool:
+    """Whether a failed Discord call in a close stage is worth retrying.
+    Permanent failures (channel gone, permission lost) are logged instead,
+    so the close still finishes and frees the ticket."""
+    if isinstance(e, discord.NotFound):
+        return False  # channel or member already gone
+    if isinstance(e, discord.HTTPException) and e.status < 500:
+        print(f"[Close Error] #{getattr(channel, 'name', channel)}: {e}")
+        return False
+    return True  # 5xx, timeouts, connection errors
+
+
+async def _close_stage_finish(bot, job, guild, channel):
+    await db.delete_ticket(job["channel_id"])
+    await db.run_io(capture.discard, job["channel_id"])
+    if channel:
+        amt = job["amount"]
+        s   = f"✅ Completed (€{amt:.2f})" if amt else "❌ Cancelled"
+        try:
+            await scheduler.run(lambda: channel.send(f"🔒 **Ticket closed.** Status: {s}"), f"messages:{channel.id}")
+        except discord.HTTPException as e:
+            if _close_error_is_transient(e, channel):
+                raise
+
+
+_CLOSE_STAGES = {
+    "transcript": _close_stage_transcript,
+    "log":        _close_stage_log,
+    "ledger":     _close_stage_ledger,
+    "channel":    _close_stage_channel,
+    "finish":     _close_stage_finish,
+}
+
+
+async def _run_close_job(bot: commands.Bot, channel_id: int):
+    job = await db.run_io(close_jobs.get, channel_id)
+    if not job:
+        return
+    guild   = bot.get_guild(int(job["guild_id"]))
+    channel = guild.get_channel(channel_id) if guild else None
+    for stage in close_jobs.STAGES:
+        if stage in job["done"]:
+            continue
+        await _CLOSE_STAGES[stage](bot, job, guild, channel)
+        await db.run_io(close_jobs.mark_done, channel_id, stage)
+    await db.run_io(close_jobs.remove, channel_id)
+
+
+async def _close_worker(bot: commands.Bot):
+    await bot.wait_until_ready()
+    while True:
+        channel_id = await _close_queue.get()
+        try:
+            await _run_close_job(bot, channel_id)
+        except Exception as e:
+            # The job stays on disk; retry from the failed stage with a growing delay
+            tries = _close_failures[channel_id] = _close_failures.get(channel_id, 0) + 1
+            print(f"[Close Error] {channel_id} (attempt {tries}): {e}")
+            if tries < 5:
+                asyncio.get_running_loop().call_later(60 * tries, _close_queue.put_nowait, channel_id)
+        else:
+            _close_failures.pop(channel_id, None)
+
 
-    delete_ticket(channel.id)
-    s = f"✅ Completed (€{amt:.2f})" if amt else "❌ Cancelled"
-    await channel.send(f"🔒 **Ticket closed.** Status: {s}")
+def _can_close(interaction: discord.Interaction, ticket: dict) -> bool:
+    return (interaction.user.id == ticket.get("user_id") or
+            permissions.has(interaction.user, permissions.STAFF))
+
+
+async def _begin_close(interaction: discord.Interaction) -> Optional[dict]:
+    """Atomically mark the channel's ticket as "closing".
+
+    Replies to the interaction and returns None if it is not a ticket, the
+    user may not close it, or another close is already in progress.
+    """
+    async with db.ticket_lock(interaction.channel.id):
+        ticket = await db.get_ticket(interaction.channel.id)
+        if not ticket:
+            await interaction.response.send_message("❌ Not a ticket channel.", ephemeral=True)
+            return None
+        if not _can_close(interaction, ticket):
+            await interaction.response.send_message("❌ No permission.", ephemeral=True)
+            return None
+        if ticket.get("status", "open") != "open":
+            # "closing", or already completed/cancelled with its close job still running
+            await interaction.response.send_message("❌ This ticket is already being closed.", ephemeral=True)
+            return None
+        ticket["status"]     = "closing"
+        ticket["closing_at"] = time.time()
+        await db.set_ticket(interaction.channel.id, ticket)
+        return ticket
+
+
+async def _begin_bulk_close(channel_id: int) -> Optional[dict]:
+    """_begin_close for /close-bulk: claims an open ticket, or one stuck in
+    "closing" for over 10 minutes with no close job behind it."""
+    async with db.ticket_lock(channel_id):
+        ticket = await db.get_ticket(channel_id)
+        if not ticket:
+            return None
+        if ticket.get("status") == "closing":
+            if time.time() - ticket.get("closing_at", 0) < 600 or await db.run_io(close_jobs.get, channel_id):
+                return None
+        elif ticket.get("status") != "open":
+            return None
+        ticket["status"]     = "closing"
+        ticket["closing_at"] = time.time()
+        await db.set_ticket(channel_id, ticket)
+        return ticket
+
+
+# ── Wizard state ───────────────────────────────────────────────────────────────
+# The wizard keeps no per-user state on the server. Each step's component
+# carries the answers so far in its custom_id — "xw:<step>:<payload>:<sig>"
+# — where the payload is a handful of base-36 fields and sig is an HMAC over
+# step and payload, so users cannot forge amounts or someone else's flow.
+# The components are DynamicItems registered with bot.add_dynamic_items(),
+# so any instance of the bot can continue a flow, including after a restart.
+
+_B36 = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+# Confirm tokens already used, so a double click cannot open two tickets.
+# Entries expire with the token itself.
+_used_confirms: dict[str, float] = {}
+
+
+def _b36(n: int) -> str:
+    out = ""
+    while True:
+        n, r = divmod(n, 36)
+        out = _B36[r] + out
+        if not n:
+            return out
+
+
+def _wizard_ttl() -> int:
+    return int(get_config().get("wizard-expiry-minutes", 60)) * 60
+
+
+def _wizard_key() -> bytes:
+    cfg    = get_config()
+    secret = cfg.get("wizard-secret") or cfg.get("token", "")
+    return hashlib.sha256(f"exchange-wizard:{secret}".encode()).digest()
+
+
+def _sign(step: str, payload: str) -> str:
+    digest = hmac.new(_wizard_key(), f"{step}:{payload}".encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:9]).decode()
+
+
+def _details_for(method: Optional[str]) -> list[str]:
+    return PAYPAL_TYPES if method == "PayPal" else CRYPTO_COINS if method == "Crypto" else []
+
+
+def _wizard_id(step: str, uid: int, state: dict) -> str:
+    def idx(options, value):
+        return _b36(options.index(value)) if value in options else "-"
+
+    s_meth, r_meth = state.get("send_method"), state.get("receive_method")
+    amount = state.get("amount")
+    payload = ".".join([
+        _b36(uid), _b36(int(time.time()) // 60),
+        idx(PAYMENT_METHODS, s_meth), idx(_details_for(s_meth), state.get("send_detail")),
+        idx(PAYMENT_METHODS, r_meth), idx(_details_for(r_meth), state.get("receive_detail")),
+        _b36(round(amount * 100)) if amount else "-",
+    ])
+    return f"xw:{step}:{payload}:{_sign(step, payload)}"
+
+
+def _template(steps: str) -> str:
+    return rf"xw:(?P<step>{steps}):(?P<payload>[0-9a-z.\-]+):(?P<sig>[A-Za-z0-9_\-]{{12}})"
+
+
+def _wizard_state(match) -> tuple[Optional[int], dict]:
+    """(uid, state) from a matched custom_id; uid is None if the signature
+    is wrong or the flow has expired."""
+    step, payload = match["step"], match["payload"]
+    if not hmac.compare_digest(match["sig"], _sign(step, payload)):
+        return None, {}
+    try:
+        uid, issued, s_meth, s_det, r_meth, r_det, amount = payload.split(".")
+        if time.time() - int(issued, 36) * 60 > _wizard_ttl():
+            return None, {}
+
+        def pick(options, value):
+            return options[int(value, 36)] if value != "-" else None
+
+        state = {"send_method": pick(PAYMENT_METHODS, s_meth), "receive_method": pick(PAYMENT_METHODS, r_meth)}
+        state["send_detail"]    = pick(_details_for(state["send_method"]), s_det)
+        state["receive_detail"] = pick(_details_for(state["receive_method"]), r_det)
+        state["amount"]         = int(amount, 36) / 100 if amount != "-" else None
+        return int(uid, 36), state
+    except (ValueError, IndexError):
+        return None, {}
+
+
+async def _wizard_check(interaction: discord.Interaction, uid: Optional[int]) -> bool:
+    if uid is None:
+        await interaction.response.send_message("❌ Session expired. Please start over.", ephemeral=True)
+        return False
+    if interaction.user.id != uid:
+        await interaction.response.send_message("❌ This exchange belongs to someone else.", ephemeral=True)
+        return False
+    return True
+
+
+def _wizard_view(item: discord.ui.Item) -> discord.ui.View:
+    # Only dynamic items, so discord.py keeps nothing in its view store
+    view = discord.ui.View(timeout=None)
+    view.add_item(item)
+    return view
 
 
 # ── Wizard helpers ─────────────────────────────────────────────────────────────
 
-def _send_select_view() -> tuple[discord.Embed, discord.ui.View]:
+def _send_select_view(uid: int) -> tuple[discord.Embed, discord.ui.View]:
     """Step 1 — what are you sending?"""
     emb = discord.Embed(
         title="💱 Open Exchange — Step 1 of 3",
         description="**What payment method are you sending?**\nSelect from the dropdown below.",
         color=discord.Color.blurple(),
     )
-    view = discord.ui.View(timeout=300)
-    view.add_item(SendMethodSelect())
-    return emb, view
+    return emb, _wizard_view(SendMethodSelect(uid, {}))
 
 
-async def _show_receive_select(interaction: discord.Interaction, uid: int):
-    state  = PENDING.get(uid, {})
+async def _show_receive_select(interaction: discord.Interaction, uid: int, state: dict):
     s_meth = state.get("send_method", "?")
     s_det  = state.get("send_detail")
     send_s = s_meth + (f" ({s_det})" if s_det else "")
@@ -187,92 +417,116 @@ async def _show_receive_select(interaction: discord.Interaction, uid: int):
         description=f"✅ **Sending:** {send_s}\n\nSelect your receive method below.",
         color=discord.Color.blurple(),
     )
-    view = discord.ui.View(timeout=300)
-    view.add_item(ReceiveMethodSelect(exclude=s_meth))
-    await interaction.response.edit_message(embed=emb, view=view)
+    await interaction.response.edit_message(embed=emb, view=_wizard_view(ReceiveMethodSelect(uid, state)))
 
 
-async def _show_amount_modal(interaction: discord.Interaction, uid: int):
-    await interaction.response.send_modal(AmountModal(uid))
+async def _show_amount_modal(interaction: discord.Interaction, uid: int, state: dict):
+    await interaction.response.send_modal(AmountModal(uid, state))
 
 
 # ── Selects ────────────────────────────────────────────────────────────────────
 
-class SendMethodSelect(discord.ui.Select):
-    def __init__(self):
+class SendMethodSelect(discord.ui.DynamicItem[discord.ui.Select], template=_template("sm")):
+    def __init__(self, uid: Optional[int], state: dict):
+        self.uid, self.state = uid, state
         opts = [discord.SelectOption(label=m, value=m, emoji=METHOD_EMOJI.get(m, "💳"))
                 for m in PAYMENT_METHODS]
-        super().__init__(placeholder="What are you sending?", options=opts)
+        super().__init__(discord.ui.Select(custom_id=_wizard_id("sm", uid or 0, state),
+                                           placeholder="What are you sending?", options=opts))
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(*_wizard_state(match))
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return await _wizard_check(interaction, self.uid)
 
     async def callback(self, interaction: discord.Interaction):
-        method = self.values[0]
-        uid    = interaction.user.id
-        PENDING[uid] = {"send_method": method}
+        method = self.item.values[0]
+        uid    = self.uid
+        state  = {"send_method": method}
 
         if method == "PayPal":
             emb = discord.Embed(title="💱 Step 1b — PayPal type",
                 description="✅ **Sending:** PayPal\n\nAre you paying via **Card** or **PayPal Balance**?",
                 color=discord.Color.blurple())
-            v = discord.ui.View(timeout=300)
-            v.add_item(PayPalTypeSelect(role="send"))
-            await interaction.response.edit_message(embed=emb, view=v)
+            await interaction.response.edit_message(embed=emb, view=_wizard_view(PayPalTypeSelect(uid, state, "send")))
 
         elif method == "Crypto":
             emb = discord.Embed(title="💱 Step 1b — Crypto coin",
                 description="✅ **Sending:** Crypto\n\nWhich cryptocurrency are you sending?",
                 color=discord.Color.blurple())
-            v = discord.ui.View(timeout=300)
-            v.add_item(CryptoCoinSelect(role="send"))
-            await interaction.response.edit_message(embed=emb, view=v)
+            await interaction.response.edit_message(embed=emb, view=_wizard_view(CryptoCoinSelect(uid, state, "send")))
 
         else:
-            await _show_receive_select(interaction, uid)
+            await _show_receive_select(interaction, uid, state)
+
+
+class PayPalTypeSelect(discord.ui.DynamicItem[discord.ui.Select], template=_template("ps|pr")):
+    def __init__(self, uid: Optional[int], state: dict, role: str):
+        self.uid, self.state, self.role = uid, state, role
+        super().__init__(discord.ui.Select(custom_id=_wizard_id("ps" if role == "send" else "pr", uid or 0, state),
+                                           placeholder="Card or PayPal Balance?",
+                                           options=[discord.SelectOption(label=t, value=t) for t in PAYPAL_TYPES]))
 
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(*_wizard_state(match), "send" if match["step"] == "ps" else "receive")
 
-class PayPalTypeSelect(discord.ui.Select):
-    def __init__(self, role: str):
-        self.role = role
-        super().__init__(placeholder="Card or PayPal Balance?",
-                         options=[discord.SelectOption(label=t, value=t) for t in PAYPAL_TYPES])
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return await _wizard_check(interaction, self.uid)
 
     async def callback(self, interaction: discord.Interaction):
-        uid   = interaction.user.id
-        state = PENDING.setdefault(uid, {})
         if self.role == "send":
-            state["send_detail"] = self.values[0]
-            await _show_receive_select(interaction, uid)
+            self.state["send_detail"] = self.item.values[0]
+            await _show_receive_select(interaction, self.uid, self.state)
         else:
-            state["receive_detail"] = self.values[0]
-            await _show_amount_modal(interaction, uid)
+            self.state["receive_detail"] = self.item.values[0]
+            await _show_amount_modal(interaction, self.uid, self.state)
 
 
-class CryptoCoinSelect(discord.ui.Select):
-    def __init__(self, role: str):
-        self.role = role
-        super().__init__(placeholder="Which cryptocurrency?",
-                         options=[discord.SelectOption(label=c, value=c) for c in CRYPTO_COINS])
+class CryptoCoinSelect(discord.ui.DynamicItem[discord.ui.Select], template=_template("cs|cr")):
+    def __init__(self, uid: Optional[int], state: dict, role: str):
+        self.uid, self.state, self.role = uid, state, role
+        super().__init__(discord.ui.Select(custom_id=_wizard_id("cs" if role == "send" else "cr", uid or 0, state),
+                                           placeholder="Which cryptocurrency?",
+                                           options=[discord.SelectOption(label=c, value=c) for c in CRYPTO_COINS]))
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(*_wizard_state(match), "send" if match["step"] == "cs" else "receive")
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return await _wizard_check(interaction, self.uid)
 
     async def callback(self, interaction: discord.Interaction):
-        uid   = interaction.user.id
-        state = PENDING.setdefault(uid, {})
         if self.role == "send":
-            state["send_detail"] = self.values[0]
-            await _show_receive_select(interaction, uid)
+            self.state["send_detail"] = self.item.values[0]
+            await _show_receive_select(interaction, self.uid, self.state)
         else:
-            state["receive_detail"] = self.values[0]
-            await _show_amount_modal(interaction, uid)
+            self.state["receive_detail"] = self.item.values[0]
+            await _show_amount_modal(interaction, self.uid, self.state)
 
 
-class ReceiveMethodSelect(discord.ui.Select):
-    def __init__(self, exclude: str):
+class ReceiveMethodSelect(discord.ui.DynamicItem[discord.ui.Select], template=_template("rm")):
+    def __init__(self, uid: Optional[int], state: dict):
+        self.uid, self.state = uid, state
         opts = [discord.SelectOption(label=m, value=m, emoji=METHOD_EMOJI.get(m, "💳"))
-                for m in PAYMENT_METHODS if m != exclude]
-        super().__init__(placeholder="What do you want to receive?", options=opts)
+                for m in PAYMENT_METHODS if m != state.get("send_method")]
+        super().__init__(discord.ui.Select(custom_id=_wizard_id("rm", uid or 0, state),
+                                           placeholder="What do you want to receive?", options=opts))
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(*_wizard_state(match))
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return await _wizard_check(interaction, self.uid)
 
     async def callback(self, interaction: discord.Interaction):
-        method = self.values[0]
-        uid    = interaction.user.id
-        state  = PENDING.setdefault(uid, {})
+        method = self.item.values[0]
+        uid    = self.uid
+        state  = self.state
         state["receive_method"] = method
         send_s = state.get("send_method","?") + (f" ({state['send_detail']})" if state.get("send_detail") else "")
 
@@ -280,47 +534,56 @@ class ReceiveMethodSelect(discord.ui.Select):
             emb = discord.Embed(title="💱 Step 2b — PayPal type",
                 description=f"✅ **Sending:** {send_s}\n✅ **Receiving:** PayPal\n\nVia **Card** or **PayPal Balance**?",
                 color=discord.Color.blurple())
-            v = discord.ui.View(timeout=300)
-            v.add_item(PayPalTypeSelect(role="receive"))
-            await interaction.response.edit_message(embed=emb, view=v)
+            await interaction.response.edit_message(embed=emb, view=_wizard_view(PayPalTypeSelect(uid, state, "receive")))
 
         elif method == "Crypto":
             emb = discord.Embed(title="💱 Step 2b — Crypto coin",
                 description=f"✅ **Sending:** {send_s}\n✅ **Receiving:** Crypto\n\nWhich coin do you want to receive?",
                 color=discord.Color.blurple())
-            v = discord.ui.View(timeout=300)
-            v.add_item(CryptoCoinSelect(role="receive"))
-            await interaction.response.edit_message(embed=emb, view=v)
+            await interaction.response.edit_message(embed=emb, view=_wizard_view(CryptoCoinSelect(uid, state, "receive")))
 
         else:
-            await _show_amount_modal(interaction, uid)
+            await _show_amount_modal(interaction, uid, state)
 
 
 # ── Modals ─────────────────────────────────────────────────────────────────────
 
+def _amount_error(amt: float) -> Optional[str]:
+    """Why amt cannot be used as an exchange amount, or None if it can."""
+    if not math.isfinite(amt) or amt <= 0:
+        return "❌ Invalid amount."
+    max_amt = float(get_config().get("max-exchange-amount", 100000))
+    if amt > max_amt:
+        return f"❌ The maximum amount is €{max_amt:,.2f}."
+    return None
+
+
 class AmountModal(discord.ui.Modal, title="Exchange Amount"):
     amount = discord.ui.TextInput(label="How much are you sending? (in €)",
                                   placeholder="e.g. 50.00", required=True, max_length=20)
 
-    def __init__(self, uid: int):
-        super().__init__()
-        self.uid = uid
+    def __init__(self, uid: int, state: dict):
+        # Modals cannot be dynamic items; this one only lives while it is open
+        super().__init__(timeout=600)
+        self.uid   = uid
+        self.state = state
 
     async def on_submit(self, interaction: discord.Interaction):
         raw = self.amount.value.replace("€","").replace("$","").replace(",",".").strip()
         try:
-            amt = float(raw)
-            assert amt > 0
-        except Exception:
+            amt = round(float(raw), 2)
+        except ValueError:
             await interaction.response.send_message("❌ Invalid amount.", ephemeral=True)
             return
+        error = _amount_error(amt)
+        if error:
+            await interaction.response.send_message(error, ephemeral=True)
+            return
 
-        state = PENDING.get(self.uid, {})
+        state = self.state
         state["amount"] = amt
         fd = calculate_fee(state["send_method"], state.get("send_detail"),
                            state["receive_method"], state.get("receive_detail"), amt)
-        state["fee_data"] = fd
-        PENDING[self.uid]  = state
 
         send_s = state["send_method"] + (f" ({state['send_detail']})"    if state.get("send_detail")    else "")
         recv_s = state["receive_method"] + (f" ({state.get('receive_detail')})" if state.get("receive_detail") else "")
@@ -336,7 +599,7 @@ class AmountModal(discord.ui.Modal, title="Exchange Amount"):
         if fd.get("note"):
             emb.add_field(name="ℹ️ Note", value=fd["note"], inline=False)
         emb.set_footer(text="Fees calculated on amount you send · Exchora Exchange")
-        await interaction.response.send_message(embed=emb, view=ConfirmTicketView(self.uid), ephemeral=True)
+        await interaction.response.send_message(embed=emb, view=ConfirmTicketView(self.uid, state), ephemeral=True)
 
 
 class CloseTicketModal(discord.ui.Modal, title="Close Exchange Ticket"):
@@ -346,11 +609,6 @@ class CloseTicketModal(discord.ui.Modal, title="Close Exchange Ticket"):
                                   required=False, max_length=200, default="No reason provided")
 
     async def on_submit(self, interaction: discord.Interaction):
-        ticket = get_ticket(interaction.channel.id)
-        if not ticket:
-            await interaction.response.send_message("❌ Not a ticket channel.", ephemeral=True)
-            return
-
         raw = (self.amount.value or "").replace("€","").replace("$","").replace(",",".").strip()
         amt = None
         if raw:
@@ -359,6 +617,14 @@ class CloseTicketModal(discord.ui.Modal, title="Close Exchange Ticket"):
                 if amt <= 0: amt = None
             except ValueError:
                 pass
+        error = _amount_error(amt) if amt is not None else None
+        if error:
+            await interaction.response.send_message(error, ephemeral=True)
+            return
+
+        ticket = await _begin_close(interaction)
+        if not ticket:
+            return
 
         await interaction.response.send_message("🔒 Closing ticket and generating transcript…")
         await _do_close(interaction.client, interaction.channel, interaction.guild,
@@ -375,146 +641,208 @@ class ExchangePanelView(discord.ui.View):
     @discord.ui.button(label="Open Exchange Ticket", style=discord.ButtonStyle.primary,
                        emoji="💱", custom_id="btn_open_exchange")
     async def open_exchange(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if is_blacklisted(interaction.user.id):
+        if await db.is_blacklisted(interaction.user.id):
             await interaction.response.send_message(
                 "🚫 You are blacklisted and cannot open exchange tickets.", ephemeral=True)
             return
+        error = await _open_limit_error(interaction.user)
+        if error:
+            await interaction.response.send_message(error, ephemeral=True)
+            return
 
         # Immediately show Step 1 — no intermediate message
-        PENDING[interaction.user.id] = {}
-        emb, view = _send_select_view()
+        emb, view = _send_select_view(interaction.user.id)
         await interaction.response.send_message(embed=emb, view=view, ephemeral=True)
 
 
-class ConfirmTicketView(discord.ui.View):
-    def __init__(self, uid: int):
-        super().__init__(timeout=120)
-        self.uid = uid
+async def _open_limit_error(user: discord.abc.User) -> Optional[str]:
+    """Why user may not open another ticket, or None if they may."""
+    limit = int(get_config().get("max-open-tickets-per-user", 2))
+    if limit <= 0 or permissions.has(user, permissions.STAFF):
+        return None
+    mine = await db.find_tickets(user_id=user.id, status="open")
+    if len(mine) < limit:
+        return None
+    links = ", ".join(f"<#{cid}>" for cid in mine)
+    return f"❌ You already have {len(mine)} open ticket(s): {links}. Please finish them before opening another."
 
-    @discord.ui.button(label="Confirm & Open Ticket", style=discord.ButtonStyle.success, emoji="✅")
-    async def confirm(self, interaction: discord.Interaction, button: discord.ui.Button):
-        state = PENDING.pop(self.uid, None)
-        if not state:
-            await interaction.response.send_message("❌ Session expired. Please start over.", ephemeral=True)
-            return
 
-        await interaction.response.edit_message(content="⏳ Creating your ticket…", embed=None, view=None)
-
-        guild  = interaction.guild
-        cfg    = get_config()
-        s_meth = state["send_method"]
-        r_meth = state["receive_method"]
-        s_det  = state.get("send_detail")
-        r_det  = state.get("receive_detail")
-        amount = state.get("amount")
-        fd     = state.get("fee_data", {})
-
-        cat_id = cfg.get(f"{s_meth}-Category") or cfg.get("claimed-exchanges-category-id")
-
-        overwrites = {
-            guild.default_role: discord.PermissionOverwrite(view_channel=False),
-            interaction.user:   discord.PermissionOverwrite(view_channel=True, send_messages=True, read_message_history=True),
-        }
-        for rid in cfg.get("ids-to-have-full-access-in-tickets", []):
-            r = guild.get_role(int(rid))
-            if r:
-                overwrites[r] = discord.PermissionOverwrite(view_channel=True, send_messages=True,
-                                                             read_message_history=True, manage_messages=True)
-        for rid in cfg.get("exchangers", []):
-            r = guild.get_role(int(rid))
-            if r:
-                overwrites[r] = discord.PermissionOverwrite(view_channel=True, send_messages=True, read_message_history=True)
-
-        safe_name = interaction.user.name[:15].lower().replace(" ", "-")
-        ch_name   = f"exchange-{safe_name}-{str(interaction.user.id)[-4:]}"
-        category  = guild.get_channel(int(cat_id)) if cat_id else None
+async def _open_ticket(interaction: discord.Interaction, state: dict):
+    """Create the ticket channel for a confirmed wizard state."""
+    await interaction.response.edit_message(content="⏳ Creating your ticket…", embed=None, view=None)
 
-        try:
-            channel = await guild.create_text_channel(name=ch_name, overwrites=overwrites, category=category)
-        except Exception as e:
-            await interaction.edit_original_response(content=f"❌ Failed to create channel: {e}")
-            return
+    guild  = interaction.guild
+    conf   = settings()
+    s_meth = state["send_method"]
+    r_meth = state["receive_method"]
+    s_det  = state.get("send_detail")
+    r_det  = state.get("receive_detail")
+    amount = state.get("amount")
+    fd     = calculate_fee(s_meth, s_det, r_meth, r_det, amount)
+
+    cat_id = conf.categories.get(s_meth) or conf.raw.get("claimed-exchanges-category-id")
+
+    overwrites = {
+        guild.default_role: discord.PermissionOverwrite(view_channel=False),
+        interaction.user:   discord.PermissionOverwrite(view_channel=True, send_messages=True, read_message_history=True),
+    }
+    for rid in conf.staff:
+        r = guild.get_role(int(rid))
+        if r:
+            overwrites[r] = discord.PermissionOverwrite(view_channel=True, send_messages=True,
+                                                         read_message_history=True, manage_messages=True)
+    for rid in conf.exchangers:
+        r = guild.get_role(int(rid))
+        if r:
+            overwrites[r] = discord.PermissionOverwrite(view_channel=True, send_messages=True, read_message_history=True)
+
+    safe_name = interaction.user.name[:15].lower().replace(" ", "-")
+    ch_name   = f"exchange-{safe_name}-{str(interaction.user.id)[-4:]}"
 
-        send_s = s_meth + (f" ({s_det})" if s_det else "")
-        recv_s = r_meth + (f" ({r_det})" if r_det else "")
-
-        ticket_data = {
-            "user_id": interaction.user.id, "channel_id": channel.id,
-            "send_method": s_meth, "send_detail": s_det,
-            "receive_method": r_meth, "receive_detail": r_det,
-            "amount": amount, "fee": fd.get("fee"),
-            "receive_amount": fd.get("receive"), "fee_percent": fd.get("percent"),
-            "claimed": False, "claimed_by": None,
-            "status": "open", "created_at": time.time(),
-        }
-        set_ticket(channel.id, ticket_data)
-
-        emb = discord.Embed(title="💱 Exchange Ticket",
-                            description=f"Welcome {interaction.user.mention}! An exchanger will assist you shortly.",
-                            color=discord.Color.blurple(), timestamp=discord.utils.utcnow())
-        emb.add_field(name="📤 Sending",   value=f"**{send_s}**", inline=True)
-        emb.add_field(name="📥 Receiving", value=f"**{recv_s}**", inline=True)
-        emb.add_field(name="\u200b",       value="\u200b",        inline=True)
-        if amount:
-            emb.add_field(name="💰 Amount Sent",              value=f"**€{amount:.2f}**",           inline=True)
-            emb.add_field(name=f"🏷️ Fee ({fd.get('percent',0)}%)", value=f"**€{fd.get('fee',0):.2f}**", inline=True)
-            emb.add_field(name="✅ They Receive",              value=f"**€{fd.get('receive',0):.2f}**", inline=True)
-        if fd.get("note"):
-            emb.add_field(name="ℹ️ Note", value=fd["note"], inline=False)
-        emb.set_footer(text=f"Opened by {interaction.user} · Exchora Exchange")
+    try:
+        async with categories.slot(guild, cat_id, conf.overflow) as category:
+            channel = await scheduler.run(
+                lambda: guild.create_text_channel(name=ch_name, overwrites=overwrites, category=category),
+                f"guild-channels:{guild.id}")
+    except Exception as e:
+        await interaction.edit_original_response(content=f"❌ Failed to create channel: {e}")
+        return
 
-        await channel.send(content=interaction.user.mention, embed=emb, view=TicketControlView())
+    send_s = s_meth + (f" ({s_det})" if s_det else "")
+    recv_s = r_meth + (f" ({r_det})" if r_det else "")
+
+    ticket_data = {
+        "user_id": interaction.user.id, "channel_id": channel.id,
+        "send_method": s_meth, "send_detail": s_det,
+        "receive_method": r_meth, "receive_detail": r_det,
+        "amount": amount, "fee": fd.get("fee"),
+        "receive_amount": fd.get("receive"), "fee_percent": fd.get("percent"),
+        "claimed": False, "claimed_by": None,
+        "status": "open", "created_at": time.time(),
+    }
+    await db.set_ticket(channel.id, ticket_data)
+    await db.run_io(capture.start, channel.id)
+
+    emb = discord.Embed(title="💱 Exchange Ticket",
+                        description=f"Welcome {interaction.user.mention}! An exchanger will assist you shortly.",
+                        color=discord.Color.blurple(), timestamp=discord.utils.utcnow())
+    emb.add_field(name="📤 Sending",   value=f"**{send_s}**", inline=True)
+    emb.add_field(name="📥 Receiving", value=f"**{recv_s}**", inline=True)
+    emb.add_field(name="\u200b",       value="\u200b",        inline=True)
+    if amount:
+        emb.add_field(name="💰 Amount Sent",              value=f"**€{amount:.2f}**",           inline=True)
+        emb.add_field(name=f"🏷️ Fee ({fd.get('percent',0)}%)", value=f"**€{fd.get('fee',0):.2f}**", inline=True)
+        emb.add_field(name="✅ They Receive",              value=f"**€{fd.get('receive',0):.2f}**", inline=True)
+    if fd.get("note"):
+        emb.add_field(name="ℹ️ Note", value=fd["note"], inline=False)
+    emb.set_footer(text=f"Opened by {interaction.user} · Exchora Exchange")
+
+    jobs = [
+        scheduler.submit(lambda: channel.send(content=interaction.user.mention, embed=emb, view=TicketControlView()),
+                         f"messages:{channel.id}", scheduler.PRIORITY_USER),
+        scheduler.submit(lambda: interaction.edit_original_response(content=f"✅ Ticket created: {channel.mention}"),
+                         f"interaction:{interaction.id}", scheduler.PRIORITY_USER),
+    ]
+    ping_id = conf.pings.get(s_meth)
+    if ping_id:
+        pr = guild.get_role(int(ping_id))
+        if pr:
+            jobs.append(scheduler.submit(lambda: channel.send(pr.mention, delete_after=5), f"messages:{channel.id}"))
+    await asyncio.gather(*jobs, return_exceptions=True)
+
+
+class ConfirmButton(discord.ui.DynamicItem[discord.ui.Button], template=_template("ok")):
+    def __init__(self, uid: Optional[int], state: dict):
+        self.uid, self.state = uid, state
+        super().__init__(discord.ui.Button(label="Confirm & Open Ticket", style=discord.ButtonStyle.success,
+                                           emoji="✅", custom_id=_wizard_id("ok", uid or 0, state)))
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(*_wizard_state(match))
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return await _wizard_check(interaction, self.uid)
 
-        ping_id = cfg.get(f"{s_meth}-Ping")
-        if ping_id and int(ping_id) != 0:
-            pr = guild.get_role(int(ping_id))
-            if pr:
-                try:
-                    pm = await channel.send(pr.mention)
-                    await pm.delete(delay=5)
-                except Exception:
-                    pass
+    async def callback(self, interaction: discord.Interaction):
+        state = self.state
+        if not state.get("send_method") or not state.get("receive_method"):
+            await interaction.response.send_message("❌ Session expired. Please start over.", ephemeral=True)
+            return
+        async with db.lock(f"wizard:{self.uid}"):
+            now = time.time()
+            for token in [t for t, exp in _used_confirms.items() if exp < now]:
+                del _used_confirms[token]
+            token = self.item.custom_id
+            if token in _used_confirms:
+                await interaction.response.send_message("❌ This ticket is already being created.", ephemeral=True)
+                return
+            error = await _open_limit_error(interaction.user)
+            if error:
+                await interaction.response.edit_message(content=error, embed=None, view=None)
+                return
+            _used_confirms[token] = now + _wizard_ttl()
+            # Still under the lock, so two confirms cannot both pass the limit
+            await _open_ticket(interaction, state)
+
+
+class CancelButton(discord.ui.DynamicItem[discord.ui.Button], template=_template("no")):
+    def __init__(self, uid: Optional[int], state: dict):
+        self.uid = uid
+        super().__init__(discord.ui.Button(label="Cancel", style=discord.ButtonStyle.danger,
+                                           emoji="❌", custom_id=_wizard_id("no", uid or 0, state)))
 
-        await interaction.edit_original_response(content=f"✅ Ticket created: {channel.mention}")
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(*_wizard_state(match))
 
-    @discord.ui.button(label="Cancel", style=discord.ButtonStyle.danger, emoji="❌")
-    async def cancel(self, interaction: discord.Interaction, button: discord.ui.Button):
-        PENDING.pop(interaction.user.id, None)
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return await _wizard_check(interaction, self.uid)
+
+    async def callback(self, interaction: discord.Interaction):
         await interaction.response.edit_message(content="❌ Cancelled.", embed=None, view=None)
 
 
+class ConfirmTicketView(discord.ui.View):
+    """Confirm / Cancel for a finished wizard; both buttons carry the signed state."""
+    def __init__(self, uid: int, state: dict):
+        super().__init__(timeout=None)
+        self.add_item(ConfirmButton(uid, state))
+        self.add_item(CancelButton(uid, state))
+
+
 class TicketControlView(discord.ui.View):
     """Persistent — timeout=None, stable custom_ids."""
     def __init__(self):
         super().__init__(timeout=None)
 
     def _is_staff(self, i):
-        cfg = get_config()
-        a = cfg.get("ids-to-have-full-access-in-tickets", [])
-        return i.user.id in a or any(r.id in a for r in i.user.roles)
+        return permissions.has(i.user, permissions.STAFF)
 
     def _is_exchanger(self, i):
-        cfg = get_config()
-        e = cfg.get("exchangers", [])
-        return i.user.id in e or any(r.id in e for r in i.user.roles) or self._is_staff(i)
+        return permissions.has(i.user, permissions.EXCHANGER | permissions.STAFF)
 
     @discord.ui.button(label="Claim", style=discord.ButtonStyle.primary,
                        emoji="✋", custom_id="btn_ticket_claim")
     async def claim(self, interaction: discord.Interaction, button: discord.ui.Button):
-        ticket = get_ticket(interaction.channel.id)
-        if not ticket:
-            await interaction.response.send_message("❌ Not a ticket channel.", ephemeral=True)
-            return
-        if not self._is_exchanger(interaction):
-            await interaction.response.send_message("❌ Only exchangers can claim tickets.", ephemeral=True)
-            return
-        if ticket.get("claimed"):
-            await interaction.response.send_message(f"❌ Already claimed by <@{ticket['claimed_by']}>.", ephemeral=True)
-            return
-
-        ticket["claimed"]    = True
-        ticket["claimed_by"] = interaction.user.id
-        set_ticket(interaction.channel.id, ticket)
+        async with db.ticket_lock(interaction.channel.id):
+            ticket = await db.get_ticket(interaction.channel.id)
+            if not ticket:
+                await interaction.response.send_message("❌ Not a ticket channel.", ephemeral=True)
+                return
+            if not self._is_exchanger(interaction):
+                await interaction.response.send_message("❌ Only exchangers can claim tickets.", ephemeral=True)
+                return
+            if ticket.get("status", "open") != "open":
+                await interaction.response.send_message("❌ This ticket is being closed.", ephemeral=True)
+                return
+            if ticket.get("claimed"):
+                await interaction.response.send_message(f"❌ Already claimed by <@{ticket['claimed_by']}>.", ephemeral=True)
+                return
+
+            ticket["claimed"]    = True
+            ticket["claimed_by"] = interaction.user.id
+            await db.set_ticket(interaction.channel.id, ticket)
         try:
             await interaction.channel.edit(name=f"claimed-{interaction.channel.name}"[:100])
         except Exception:
@@ -528,7 +856,7 @@ class TicketControlView(discord.ui.View):
     @discord.ui.button(label="Close", style=discord.ButtonStyle.danger,
                        emoji="🔒", custom_id="btn_ticket_close")
     async def close(self, interaction: discord.Interaction, button: discord.ui.Button):
-        ticket = get_ticket(interaction.channel.id)
+        ticket = await db.get_ticket(interaction.channel.id)
         if not ticket:
             await interaction.response.send_message("❌ Not a ticket channel.", ephemeral=True)
             return
@@ -561,6 +889,69 @@ class TicketControlView(discord.ui.View):
 class ExchangeCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self._tasks: list[asyncio.Task] = []
+
+    async def cog_load(self):
+        global _close_queue
+        _close_queue = asyncio.Queue()
+        for job in await db.run_io(close_jobs.pending):
+            _close_queue.put_nowait(job["channel_id"])  # resume closes cut short by a restart
+        workers = max(1, int(get_config().get("close-workers", 4)))
+        self._tasks = [asyncio.create_task(_close_worker(self.bot)) for _ in range(workers)]
+        self._tasks.append(asyncio.create_task(_total_voice_loop(self.bot)))
+        self._tasks.append(asyncio.create_task(transcript_delivery.retry_loop(self.bot)))
+        self._tasks.append(asyncio.create_task(categories.cleanup_loop(self.bot)))
+        self._tasks.append(asyncio.create_task(rollups.flush_loop(self.bot)))
+        update_total_voice()  # bring the name in line with the ledger once
+
+    async def cog_unload(self):
+        for task in self._tasks:
+            task.cancel()
+
+    # ── Category channel counts ──────────────────────────────────
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
+        categories.channel_created(channel)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        categories.channel_deleted(channel)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
+        categories.channel_updated(before, after)
+
+    # ── Live transcript capture ──────────────────────────────────
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # A fresh session means events may have been missed while disconnected
+        await db.run_io(capture.mark_gaps)
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        if capture.is_active(message.channel.id):
+            from utils.transcript import snapshot_message
+            await db.run_io(capture.add_message, message.channel.id, snapshot_message(message))
+
+    # Raw events: the plain ones only fire for messages still in the cache
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent):
+        if capture.is_active(payload.channel_id):
+            from utils.transcript import snapshot_message
+            await db.run_io(capture.add_edit, payload.channel_id, snapshot_message(payload.message))
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        if capture.is_active(payload.channel_id):
+            await db.run_io(capture.add_delete, payload.channel_id, payload.message_id)
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent):
+        if capture.is_active(payload.channel_id):
+            for message_id in payload.message_ids:
+                await db.run_io(capture.add_delete, payload.channel_id, message_id)
 
     @app_commands.command(name="setup-exchange", description="Post the exchange panel in this channel")
     @app_commands.default_permissions(administrator=True)
@@ -589,18 +980,6 @@ class ExchangeCog(commands.Cog):
     @app_commands.describe(amount="Final amount in € (omit if cancelled)", reason="Reason for closing")
     async def close_cmd(self, interaction: discord.Interaction,
                         amount: Optional[str] = None, reason: Optional[str] = None):
-        ticket = get_ticket(interaction.channel.id)
-        if not ticket:
-            await interaction.response.send_message("❌ Not a ticket channel.", ephemeral=True)
-            return
-        cfg = get_config()
-        can_close = (interaction.user.id == ticket.get("user_id") or
-                     interaction.user.id in cfg.get("ids-to-have-full-access-in-tickets", []) or
-                     any(r.id in cfg.get("ids-to-have-full-access-in-tickets", []) for r in interaction.user.roles))
-        if not can_close:
-            await interaction.response.send_message("❌ No permission.", ephemeral=True)
-            return
-
         amt = None
         if amount:
             try:
@@ -608,34 +987,163 @@ class ExchangeCog(commands.Cog):
                 if amt <= 0: amt = None
             except ValueError:
                 pass
+        error = _amount_error(amt) if amt is not None else None
+        if error:
+            await interaction.response.send_message(error, ephemeral=True)
+            return
+
+        ticket = await _begin_close(interaction)
+        if not ticket:
+            return
 
         await interaction.response.send_message("🔒 Closing ticket and generating transcript…")
         await _do_close(self.bot, interaction.channel, interaction.guild,
                         ticket, interaction.user, amt, reason or "No reason provided")
 
+    @app_commands.command(name="close-bulk", description="Cancel many stale tickets at once")
+    @app_commands.describe(
+        older_than_hours="Only tickets opened at least this many hours ago",
+        status="Open tickets, or tickets stuck while closing",
+        claimed="Only claimed (True) or unclaimed (False) tickets",
+        method="Only tickets sending or receiving this payment method",
+        limit="Maximum number of tickets to close",
+        preview="Only list the tickets that would be closed",
+    )
+    @app_commands.choices(status=[
+        app_commands.Choice(name="Open", value="open"),
+        app_commands.Choice(name="Stuck closing", value="closing"),
+    ])
+    async def close_bulk(self, interaction: discord.Interaction, older_than_hours: Optional[float] = None,
+                         status: str = "open", claimed: Optional[bool] = None, method: Optional[str] = None,
+                         limit: app_commands.Range[int, 1, 500] = 50, preview: bool = False):
+        if not permissions.has(interaction.user, permissions.STAFF):
+            await interaction.response.send_message("❌ No permission.", ephemeral=True)
+            return
+        await interaction.response.defer(ephemeral=True, thinking=True)
+
+        cutoff  = time.time() - older_than_hours * 3600 if older_than_hours else None
+        method  = method.strip().lower() if method else None
+        tickets = await db.list_tickets(status)
+        selected = [
+            cid for cid, t in sorted(tickets.items(), key=lambda kv: kv[1].get("created_at") or 0)
+            if (cutoff is None or (t.get("created_at") or 0) <= cutoff)
+            and (claimed is None or bool(t.get("claimed")) == claimed)
+            and (method is None or method in ((t.get("send_method") or "").lower(),
+                                              (t.get("receive_method") or "").lower()))
+        ][:limit]
+
+        if not selected:
+            await interaction.followup.send("✅ No tickets match those filters.", ephemeral=True)
+            return
+        if preview:
+            lines = [f"<#{cid}> · <@{tickets[cid].get('user_id')}> · {tickets[cid].get('send_method')} → "
+                     f"{tickets[cid].get('receive_method')}" for cid in selected[:25]]
+            more  = f"\n…and {len(selected) - 25} more" if len(selected) > 25 else ""
+            await interaction.followup.send(f"🔍 **{len(selected)}** ticket(s) would be closed:\n"
+                                            + "\n".join(lines) + more, ephemeral=True)
+            return
+
+        guild   = interaction.guild
+        reason  = f"Bulk close by {interaction.user}"
+        pending = list(selected)
+        counts  = {"closed": 0, "skipped": 0, "failed": 0}
+        started = time.monotonic()
+
+        async def worker():
+            while pending:
+                cid    = pending.pop(0)
+                ticket = await _begin_bulk_close(cid)
+                if not ticket:
+                    counts["skipped"] += 1
+                    continue
+                channel = guild.get_channel(cid) or discord.Object(id=cid)
+                try:
+                    await _do_close(self.bot, channel, guild, ticket, interaction.user, None, reason, enqueue=False)
+                    await _run_close_job(self.bot, cid)
+                    counts["closed"] += 1
+                except Exception as e:
+                    counts["failed"] += 1
+                    print(f"[Bulk Close Error] {cid}: {e}")
+                    _close_queue.put_nowait(cid)  # the close workers retry it
+
+        def progress(final: bool = False) -> str:
+            finished = sum(counts.values())
+            elapsed  = time.monotonic() - started
+            rate     = counts["closed"] / elapsed * 60 if elapsed else 0.0
+            eta      = f" · ETA {len(pending) / (finished / elapsed):.0f}s" if finished and pending else ""
+            head     = "✅ Bulk close finished" if final else "⏳ Bulk closing"
+            return (f"{head}: **{counts['closed']}**/{len(selected)} closed · {counts['skipped']} skipped · "
+                    f"{counts['failed']} failed · {rate:.1f} tickets/min{eta}")
+
+        concurrency = max(1, int(get_config().get("close-bulk-concurrency", 3)))
+        workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(selected)))]
+        while True:
+            finished, _ = await asyncio.wait(workers, timeout=5)
+            final = len(finished) == len(workers)
+            try:
+                await scheduler.run(lambda: interaction.edit_original_response(content=progress(final)),
+                                    f"interaction:{interaction.id}")
+            except discord.HTTPException:
+                pass  # interaction token expired on a very long run
+            if final:
+                break
+
+    # ── Ticket lists ─────────────────────────────────────────────
+
+    @app_commands.command(name="my-tickets", description="List your open tickets and the tickets you claimed")
+    async def my_tickets(self, interaction: discord.Interaction):
+        uid     = interaction.user.id
+        opened  = await db.find_tickets(user_id=uid)
+        claimed = await db.find_tickets(claimed_by=uid)
+
+        def lines(tickets: dict) -> str:
+            rows = sorted(tickets.items(), key=lambda kv: kv[1].get("created_at") or 0)
+            out  = [f"<#{cid}> · {t.get('send_method')} → {t.get('receive_method')}"
+                    + (f" · €{t['amount']:.2f}" if t.get("amount") else "")
+                    + (" · closing" if t.get("status") == "closing" else "") for cid, t in rows[:15]]
+            return "\n".join(out) + (f"\n…and {len(rows) - 15} more" if len(rows) > 15 else "")
+
+        emb = discord.Embed(title="🎫 Your Tickets", color=discord.Color.blurple())
+        emb.add_field(name=f"📤 Opened ({len(opened)})", value=lines(opened) or "None", inline=False)
+        if claimed:
+            emb.add_field(name=f"✋ Claimed ({len(claimed)})", value=lines(claimed), inline=False)
+        emb.set_footer(text="Exchora Exchange • .gg/Exchora")
+        await interaction.response.send_message(embed=emb, ephemeral=True)
+
+    @app_commands.command(name="queue", description="Show open tickets waiting to be claimed")
+    async def queue_cmd(self, interaction: discord.Interaction):
+        if not permissions.has(interaction.user, permissions.EXCHANGER | permissions.STAFF):
+            await interaction.response.send_message("❌ No permission.", ephemeral=True)
+            return
+        waiting = await db.find_tickets(status="open", claimed_by=None)
+        rows    = sorted(waiting.items(), key=lambda kv: kv[1].get("created_at") or 0)
+        now     = time.time()
+        by_method: dict[str, int] = {}
+        for _, t in rows:
+            by_method[t.get("send_method") or "?"] = by_method.get(t.get("send_method") or "?", 0) + 1
+
+        emb = discord.Embed(title=f"📥 Unclaimed Tickets ({len(rows)})", color=discord.Color.blurple(),
+                            timestamp=discord.utils.utcnow())
+        if rows:
+            emb.description = "\n".join(
+                f"<#{cid}> · {t.get('send_method')} → {t.get('receive_method')}"
+                + (f" · €{t['amount']:.2f}" if t.get("amount") else "")
+                + f" · waiting {int(now - (t.get('created_at') or now)) // 60} min" for cid, t in rows[:20])
+            if len(rows) > 20:
+                emb.description += f"\n…and {len(rows) - 20} more"
+            emb.add_field(name="By Method", inline=False, value=" · ".join(
+                f"{METHOD_EMOJI.get(m, '💳')} {m}: {n}" for m, n in sorted(by_method.items(), key=lambda kv: -kv[1])))
+        else:
+            emb.description = "✅ Nothing waiting."
+        emb.set_footer(text="Exchora Exchange • .gg/Exchora")
+        await interaction.response.send_message(embed=emb, ephemeral=True)
+
     @app_commands.command(name="fees", description="Show all exchange fees")
     async def fees_cmd(self, interaction: discord.Interaction):
         emb = discord.Embed(title="💰 All Exchange Fees",
                             description="Fees are always calculated on the amount **you send**.",
                             color=discord.Color.blurple())
-        rows = [
-            ("💙 PayPal Balance → Anything", "Under €10: **10%** | €10–99: **8%** | €100+: **7%**"),
-            ("💙 PayPal Card → Anything",    "**15%**"),
-            ("🪙 Crypto → Other Methods",    "**0%**"),
-            ("🪙 Crypto → Crypto",           "**3%**"),
-            ("💚 CashApp → Anything",        "**10%** (min. $3, USD only)"),
-            ("🔵 Revolut → Anything",        "**10%**"),
-            ("💜 Venmo → Anything",          "**10%**"),
-            ("💛 Zelle → Anything",          "**10%**"),
-            ("🟢 Wise → Anything",           "**10%**"),
-            ("🏦 Bank Transfer → Anything",  "**10%**"),
-            ("🔴 Skrill → Anything",         "**10%**"),
-            ("🟠 Paysafe → Anything",        "Under €50: **25%** | €50–99: **20%** | €100+: **17%**"),
-            ("🟡 Amazon → Anything",         "**35%**"),
-            ("🍎 Apple Pay → Anything",      "**25%**"),
-            ("🎁 Wunschgutschein → Anything","**45%**"),
-        ]
-        for name, val in rows:
+        for name, val in fee_table_rows():
             emb.add_field(name=name, value=val, inline=False)
         emb.set_footer(text="Exchora Exchange • .gg/Exchora")
         await interaction.response.send_message(embed=emb, ephemeral=True)
@@ -1,24 +1,95 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
+import asyncio
+import re
+import time
 from typing import Optional
 
-from utils.database import add_blacklist, remove_blacklist, is_blacklisted, get_total
-from utils.config_loader import get_config
+from utils import async_database as db
+from utils import ledger, permissions, rollups, scheduler
+from utils.config_loader import get_config, reload_config
 
 
 def _has_perm(interaction: discord.Interaction, key: str) -> bool:
-    cfg     = get_config()
-    allowed = cfg.get(key, [])
-    if interaction.user.id in allowed:
-        return True
-    return any(r.id in allowed for r in interaction.user.roles)
+    return permissions.allows(interaction.user, key)
+
+
+_ID_RE = re.compile(r"\d{15,21}")
+
+_STATS_WINDOWS = {"day": ("Last 24 hours", 86400), "week": ("Last 7 days", 7 * 86400),
+                  "month": ("Last 30 days", 30 * 86400)}
+
+
+async def _collect_ids(users: Optional[str], file: Optional[discord.Attachment]) -> list[int]:
+    """User IDs from mentions/IDs in `users` and from an uploaded text file, de-duplicated."""
+    text = users or ""
+    if file is not None:
+        text += "\n" + (await file.read()).decode("utf-8", errors="ignore")
+    return list(dict.fromkeys(int(x) for x in _ID_RE.findall(text)))
+
+
+async def _apply_role_batched(members: list, role: discord.Role, add: bool, reason: str) -> tuple[int, int]:
+    """Add/remove `role` on many members in small concurrent batches.
+
+    Discord has no bulk role endpoint and role edits share one per-guild
+    bucket, so members are processed `bulk-role-batch-size` at a time with a
+    pause in between; the pause doubles whenever a batch hits a 429.
+    Returns (succeeded, failed).
+    """
+    cfg   = get_config()
+    size  = max(1, int(cfg.get("bulk-role-batch-size", 5)))
+    delay = float(cfg.get("bulk-role-batch-delay", 1.5))
+    ok = failed = 0
+
+    for i in range(0, len(members), size):
+        batch   = members[i:i + size]
+        calls   = [m.add_roles(role, reason=reason) if add else m.remove_roles(role, reason=reason) for m in batch]
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        for res in results:
+            if isinstance(res, Exception):
+                failed += 1
+                if isinstance(res, discord.HTTPException) and res.status == 429:
+                    delay *= 2
+            else:
+                ok += 1
+        if i + size < len(members):
+            await asyncio.sleep(delay)
+    return ok, failed
 
 
 class ModerationCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
+    # ── Permission cache invalidation ────────────────────────────
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        if before.roles != after.roles:
+            permissions.invalidate_member(after.guild.id, after.id)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member):
+        permissions.invalidate_member(member.guild.id, member.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        permissions.invalidate_role(after.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        permissions.invalidate_role(role.id)
+
+    # Role changes made while the gateway was down arrive as no update events
+    @commands.Cog.listener()
+    async def on_ready(self):
+        permissions.invalidate_all()
+
+    @commands.Cog.listener()
+    async def on_resumed(self):
+        permissions.invalidate_all()
+
     # ── /blacklist ───────────────────────────────────────────────
 
     blacklist_group = app_commands.Group(name="blacklist", description="Manage the blacklist")
@@ -30,7 +101,7 @@ class ModerationCog(commands.Cog):
             await interaction.response.send_message("❌ No permission.", ephemeral=True)
             return
 
-        add_blacklist(user.id)
+        await db.add_blacklist(user.id)
         cfg    = get_config()
         bl_rid = cfg.get("blacklisted")
         if bl_rid:
@@ -51,7 +122,7 @@ class ModerationCog(commands.Cog):
             await interaction.response.send_message("❌ No permission.", ephemeral=True)
             return
 
-        remove_blacklist(user.id)
+        await db.remove_blacklist(user.id)
         cfg    = get_config()
         bl_rid = cfg.get("blacklisted")
         if bl_rid:
@@ -61,10 +132,62 @@ class ModerationCog(commands.Cog):
 
         await interaction.response.send_message(f"✅ {user.mention} removed from blacklist.")
 
+    async def _bulk(self, interaction: discord.Interaction, users: Optional[str],
+                    file: Optional[discord.Attachment], add: bool, reason: str):
+        if not _has_perm(interaction, "blacklist"):
+            await interaction.response.send_message("❌ No permission.", ephemeral=True)
+            return
+        if file is not None and file.size > 1_000_000:
+            await interaction.response.send_message("❌ File too large (max 1 MB).", ephemeral=True)
+            return
+
+        await interaction.response.defer(thinking=True)
+        ids = await _collect_ids(users, file)
+        if not ids:
+            await interaction.followup.send("❌ No user IDs found.")
+            return
+
+        changed = await (db.add_blacklist_many(ids) if add else db.remove_blacklist_many(ids))
+
+        cfg    = get_config()
+        bl_rid = cfg.get("blacklisted")
+        role   = interaction.guild.get_role(int(bl_rid)) if bl_rid else None
+        ok = failed = 0
+        if role:
+            members = [m for m in (interaction.guild.get_member(int(u)) for u in changed) if m]
+            members = [m for m in members if (role in m.roles) != add]
+            ok, failed = await _apply_role_batched(members, role, add, reason)
+
+        title = "🚫 Bulk Blacklist" if add else "✅ Bulk Unblacklist"
+        emb   = discord.Embed(title=title, color=discord.Color.red() if add else discord.Color.green(),
+                              timestamp=discord.utils.utcnow())
+        emb.add_field(name="IDs given",                   value=str(len(ids)),                inline=True)
+        emb.add_field(name="Added" if add else "Removed", value=str(len(changed)),            inline=True)
+        emb.add_field(name="Unchanged",                   value=str(len(ids) - len(changed)), inline=True)
+        emb.add_field(name="Roles updated",               value=str(ok),                      inline=True)
+        emb.add_field(name="Role failures",               value=str(failed),                  inline=True)
+        emb.add_field(name="By",                          value=interaction.user.mention,     inline=True)
+        if add:
+            emb.add_field(name="Reason", value=reason, inline=False)
+        await interaction.followup.send(embed=emb)
+
+    @blacklist_group.command(name="bulk-add", description="Blacklist many users by ID/mention or from a text file")
+    @app_commands.describe(users="IDs or mentions separated by spaces/commas", file="Text file containing user IDs",
+                           reason="Reason")
+    async def bl_bulk_add(self, interaction: discord.Interaction, users: Optional[str] = None,
+                          file: Optional[discord.Attachment] = None, reason: Optional[str] = "No reason provided"):
+        await self._bulk(interaction, users, file, True, reason)
+
+    @blacklist_group.command(name="bulk-remove", description="Unblacklist many users by ID/mention or from a text file")
+    @app_commands.describe(users="IDs or mentions separated by spaces/commas", file="Text file containing user IDs")
+    async def bl_bulk_remove(self, interaction: discord.Interaction, users: Optional[str] = None,
+                             file: Optional[discord.Attachment] = None):
+        await self._bulk(interaction, users, file, False, "Bulk unblacklist")
+
     @blacklist_group.command(name="check", description="Check if a user is blacklisted")
     @app_commands.describe(user="User to check")
     async def bl_check(self, interaction: discord.Interaction, user: discord.Member):
-        bl = is_blacklisted(user.id)
+        bl = await db.is_blacklisted(user.id)
         await interaction.response.send_message(
             f"{user.mention} is {'🚫 **blacklisted**' if bl else '✅ **not blacklisted**'}.",
             ephemeral=True,
@@ -90,16 +213,98 @@ class ModerationCog(commands.Cog):
 
     @app_commands.command(name="total", description="Show total amount exchanged on this server")
     async def total_cmd(self, interaction: discord.Interaction):
-        total = get_total()
+        total = await db.run_io(ledger.total_cents)
         emb   = discord.Embed(
             title="💱 Total Exchanged",
-            description=f"**€{total:,.2f}** has been exchanged on this server in total!",
+            description=f"**{ledger.format_cents(total)}** has been exchanged on this server in total!",
             color=discord.Color.blurple(),
             timestamp=discord.utils.utcnow(),
         )
         emb.set_footer(text="Exchora Exchange • .gg/Exchora")
         await interaction.response.send_message(embed=emb)
 
+    # ── /stats ───────────────────────────────────────────────────
+
+    @app_commands.command(name="stats", description="Exchange volume, fees and close rates")
+    @app_commands.describe(window="Time window", method="Only tickets sending this method",
+                           exchanger="Only tickets claimed by this staff member")
+    @app_commands.choices(window=[app_commands.Choice(name=label, value=key)
+                                  for key, (label, _) in _STATS_WINDOWS.items()])
+    async def stats_cmd(self, interaction: discord.Interaction, window: str = "week",
+                        method: Optional[str] = None, exchanger: Optional[discord.Member] = None):
+        if not _has_perm(interaction, "ids-to-have-full-access-in-tickets"):
+            await interaction.response.send_message("❌ No permission.", ephemeral=True)
+            return
+        if method and exchanger:
+            await interaction.response.send_message("❌ Filter by a method or an exchanger, not both.", ephemeral=True)
+            return
+
+        label, seconds = _STATS_WINDOWS[window]
+        sums = await db.run_io(rollups.query, time.time() - seconds)
+        if method:
+            key = next((k for k in sums if k.lower() == f"m:{method.strip().lower()}"), f"m:{method}")
+            title = f"📊 Stats — {key[2:]} · {label}"
+        elif exchanger:
+            key, title = f"x:{exchanger.id}", f"📊 Stats — {exchanger.display_name} · {label}"
+        else:
+            key, title = "*", f"📊 Stats · {label}"
+
+        done, cancelled, volume, fees = sums.get(key, [0, 0, 0, 0])
+        closed = done + cancelled
+        emb = discord.Embed(title=title, color=discord.Color.blurple(), timestamp=discord.utils.utcnow())
+        emb.add_field(name="✅ Completed",    value=str(done),                                          inline=True)
+        emb.add_field(name="❌ Cancelled",    value=str(cancelled),                                     inline=True)
+        emb.add_field(name="📈 Completion",   value=f"{done / closed:.0%}" if closed else "—",          inline=True)
+        emb.add_field(name="💰 Volume",       value=ledger.format_cents(volume),                        inline=True)
+        emb.add_field(name="🏷️ Fee Revenue",  value=ledger.format_cents(fees),                          inline=True)
+
+        if key == "*":
+            for prefix, name, fmt in (("m:", "💳 By Method", lambda k: k),
+                                      ("x:", "👮 By Exchanger", lambda k: f"<@{k}>")):
+                top = sorted(((k[2:], c) for k, c in sums.items() if k.startswith(prefix)),
+                             key=lambda kc: kc[1][2], reverse=True)[:5]
+                if top:
+                    emb.add_field(name=name, inline=False, value="\n".join(
+                        f"{fmt(k)} — {ledger.format_cents(c[2])} · {c[0]}✅ {c[1]}❌" for k, c in top))
+        emb.set_footer(text="Exchora Exchange • .gg/Exchora")
+        await interaction.response.send_message(embed=emb, ephemeral=True)
+
+    # ── /scheduler-stats ─────────────────────────────────────────
+
+    @app_commands.command(name="scheduler-stats", description="Show the outbound Discord action queue")
+    async def scheduler_stats(self, interaction: discord.Interaction):
+        if not _has_perm(interaction, "ids-to-have-full-access-in-tickets"):
+            await interaction.response.send_message("❌ No permission.", ephemeral=True)
+            return
+        m = scheduler.metrics()
+        by_prio = " · ".join(f"{name}: {n}" for name, n in m["queued_by_priority"].items())
+        emb = discord.Embed(title="📬 Outbound Scheduler", color=discord.Color.blurple(),
+                            timestamp=discord.utils.utcnow())
+        emb.add_field(name="Queued",        value=f"**{m['queued']}** ({by_prio})",   inline=False)
+        emb.add_field(name="In Flight",     value=str(m["in_flight"]),              inline=True)
+        emb.add_field(name="Paused Routes", value=str(m["paused_routes"]),          inline=True)
+        emb.add_field(name="Peak Depth",    value=str(m["peak_depth"]),             inline=True)
+        emb.add_field(name="Oldest Wait",   value=f"{m['oldest_wait_s']}s",         inline=True)
+        emb.add_field(name="Avg Wait",      value=f"{m['avg_wait_ms']} ms",         inline=True)
+        emb.add_field(name="Done / Failed / 429",
+                      value=f"{m['completed']} / {m['failed']} / {m['rate_limited']}", inline=True)
+        await interaction.response.send_message(embed=emb, ephemeral=True)
+
+    # ── /reload-config ───────────────────────────────────────────
+
+    @app_commands.command(name="reload-config", description="Reload config.json without restarting the bot")
+    async def reload_config_cmd(self, interaction: discord.Interaction):
+        if not _has_perm(interaction, "ids-to-have-full-access-in-tickets"):
+            await interaction.response.send_message("❌ No permission.", ephemeral=True)
+            return
+        try:
+            await asyncio.to_thread(reload_config)
+        except (OSError, ValueError) as e:
+            await interaction.response.send_message(f"❌ config.json not reloaded, keeping the current one: {e}",
+                                                    ephemeral=True)
+            return
+        await interaction.response.send_message("✅ Config reloaded.", ephemeral=True)
+
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(ModerationCog(bot))
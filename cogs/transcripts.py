@@ -0,0 +1,101 @@
+import discord
+from discord.ext import commands
+from discord import app_commands
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from utils import async_database as db
+from utils import permissions, transcript_archive, transcript_delivery, transcript_search
+
+
+def _is_staff(interaction: discord.Interaction) -> bool:
+    return permissions.has(interaction.user, permissions.STAFF)
+
+
+def _parse_day(value: Optional[str], end: bool = False) -> Optional[float]:
+    """'YYYY-MM-DD' → UTC timestamp of the start (or end) of that day."""
+    if not value:
+        return None
+    day = datetime.strptime(value.strip(), "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    return day.timestamp() + (86399.999 if end else 0)
+
+
+class TranscriptCog(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    @app_commands.command(name="transcript-search", description="Search archived ticket transcripts")
+    @app_commands.describe(
+        query="Words to find (wallet address, username, phrase…)",
+        user="Only tickets opened by this user",
+        status="Only completed or cancelled tickets",
+        method="Only tickets sending or receiving this payment method",
+        since="From date (YYYY-MM-DD)",
+        until="To date (YYYY-MM-DD)",
+    )
+    @app_commands.choices(status=[
+        app_commands.Choice(name="Completed", value="completed"),
+        app_commands.Choice(name="Cancelled", value="cancelled"),
+    ])
+    async def transcript_search(self, interaction: discord.Interaction, query: str,
+                                user: Optional[discord.User] = None, status: Optional[str] = None,
+                                method: Optional[str] = None, since: Optional[str] = None,
+                                until: Optional[str] = None):
+        if not _is_staff(interaction):
+            await interaction.response.send_message("❌ No permission.", ephemeral=True)
+            return
+        try:
+            t_since, t_until = _parse_day(since), _parse_day(until, end=True)
+        except ValueError:
+            await interaction.response.send_message("❌ Dates must look like 2025-01-31.", ephemeral=True)
+            return
+
+        started = time.perf_counter()
+        total, results = await db.run_io(
+            transcript_search.search, query, user.id if user else None, status, method, t_since, t_until,
+        )
+        took_ms = (time.perf_counter() - started) * 1000
+
+        if not results:
+            await interaction.response.send_message(f"🔍 No transcripts match **{query}**.", ephemeral=True)
+            return
+
+        lines = []
+        for entry, matches in results:
+            closed = int(entry["closed_at"])
+            lines.append(
+                f"**#{entry['channel_name']}** · <@{entry['user_id']}> · {entry['status'].capitalize()} · "
+                f"{entry.get('send_method') or '?'} → {entry.get('receive_method') or '?'} · <t:{closed}:d>\n"
+                f"└ {matches} matching message(s) · key `{entry['key']}`"
+            )
+        emb = discord.Embed(
+            title=f"🔍 Transcript search — {query}"[:256],
+            description="\n".join(lines),
+            color=discord.Color.blurple(),
+        )
+        emb.set_footer(text=f"{total} match(es) · showing {len(results)} · {took_ms:.1f} ms · /transcript-get <key>")
+        await interaction.response.send_message(embed=emb, ephemeral=True)
+
+    @app_commands.command(name="transcript-get", description="Fetch an archived transcript by key")
+    @app_commands.describe(key="Transcript key from /transcript-search")
+    async def transcript_get(self, interaction: discord.Interaction, key: str):
+        if not _is_staff(interaction):
+            await interaction.response.send_message("❌ No permission.", ephemeral=True)
+            return
+        entry = await db.run_io(transcript_archive.get, key.strip())
+        if not entry:
+            await interaction.response.send_message("❌ No transcript with that key.", ephemeral=True)
+            return
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        url = await transcript_delivery.attachment_url(self.bot, entry)
+        if url:
+            await interaction.followup.send(f"📋 [{entry['filename']}]({url})", ephemeral=True)
+            return
+        file = await asyncio.to_thread(transcript_delivery.upload_file, entry)
+        await interaction.followup.send(file=file, ephemeral=True)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(TranscriptCog(bot))
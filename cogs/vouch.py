@@ -4,7 +4,7 @@ from discord import app_commands
 from typing import Optional
 import time
 
-from utils.database import add_vouch, get_vouches
+from utils import async_database as db
 from utils.config_loader import get_config
 
 
@@ -36,7 +36,7 @@ class VouchCog(commands.Cog):
             return
 
         stars = "⭐" * rating + "☆" * (5 - rating)
-        add_vouch({
+        await db.add_vouch({
             "from":      str(interaction.user.id),
             "target":    str(user.id),
             "rating":    rating,
@@ -44,14 +44,13 @@ class VouchCog(commands.Cog):
             "timestamp": time.time(),
         })
 
-        all_v = get_vouches(user.id)
-        avg   = sum(v["rating"] for v in all_v) / len(all_v)
+        stats = await db.get_vouch_stats(user.id)
 
         emb = discord.Embed(title="✅ New Vouch", color=discord.Color.green(), timestamp=discord.utils.utcnow())
         emb.set_thumbnail(url=user.display_avatar.url)
         emb.add_field(name="👤 User",     value=user.mention,                               inline=True)
         emb.add_field(name="⭐ Rating",   value=stars,                                      inline=True)
-        emb.add_field(name="📊 Stats",    value=f"{len(all_v)} vouches | Avg: {avg:.1f}/5", inline=True)
+        emb.add_field(name="📊 Stats",    value=f"{stats['count']} vouches | Avg: {stats['average']:.1f}/5", inline=True)
         emb.add_field(name="💬 Comment",  value=comment,                                    inline=False)
         emb.add_field(name="👋 From",     value=interaction.user.mention,                   inline=True)
         emb.set_footer(text="Exchora Exchange • .gg/Exchora")
@@ -69,17 +68,21 @@ class VouchCog(commands.Cog):
     @app_commands.describe(user="User to check (leave empty for yourself)")
     async def vouches(self, interaction: discord.Interaction, user: Optional[discord.Member] = None):
         target  = user or interaction.user
-        all_v   = get_vouches(target.id)
+        stats   = await db.get_vouch_stats(target.id)
 
-        if not all_v:
+        if not stats["count"]:
             await interaction.response.send_message(f"❌ {target.mention} has no vouches yet.", ephemeral=True)
             return
 
-        avg       = sum(v["rating"] for v in all_v) / len(all_v)
+        latest    = await db.get_recent_vouches(target.id, 5)
+        avg       = stats["average"]
         avg_stars = "⭐" * round(avg) + "☆" * (5 - round(avg))
         recent    = "\n".join(
-            f"{'⭐' * v['rating']} — <@{v['from']}>: *{v['comment'][:80]}*"
-            for v in all_v[-5:][::-1]
+            f"{'⭐' * v['rating']} — <@{v['from']}>: *{(v.get('comment') or '')[:80]}*"
+            for v in latest
+        )
+        breakdown = "\n".join(
+            f"{stars}⭐ — {stats['histogram'][stars - 1]}" for stars in range(5, 0, -1)
         )
 
         emb = discord.Embed(
@@ -88,10 +91,10 @@ class VouchCog(commands.Cog):
             timestamp=discord.utils.utcnow(),
         )
         emb.set_thumbnail(url=target.display_avatar.url)
-        emb.add_field(name="📊 Total",   value=str(len(all_v)),            inline=True)
-        emb.add_field(name="⭐ Average", value=f"{avg:.1f}/5 {avg_stars}", inline=True)
-        emb.add_field(name="\u200b",     value="\u200b",                   inline=True)
-        emb.add_field(name="🕐 Recent",  value=recent or "None",           inline=False)
+        emb.add_field(name="📊 Total",     value=str(stats["count"]),        inline=True)
+        emb.add_field(name="⭐ Average",   value=f"{avg:.1f}/5 {avg_stars}", inline=True)
+        emb.add_field(name="📈 Breakdown", value=breakdown,                  inline=True)
+        emb.add_field(name="🕐 Recent",    value=recent or "None",           inline=False)
         emb.set_footer(text="Exchora Exchange • .gg/Exchora")
         await interaction.response.send_message(embed=emb)
 
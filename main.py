@@ -1,50 +1,84 @@
+import time
+STARTED = time.perf_counter()  # before the discord import, so the timeline includes it
+
 import discord
 from discord.ext import commands
 import asyncio
-import json
 import sys
 import os
+from typing import Optional
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, BASE_DIR)
 
+from utils import command_sync, startup
+from utils.config_loader import get_config, settings
 
-def load_config() -> dict:
-    path = os.path.join(BASE_DIR, "config.json")
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+startup.begin(STARTED)
+startup.mark("imports")
 
 
 intents = discord.Intents.default()
 intents.members = True
 intents.message_content = True
 
-bot = commands.Bot(command_prefix="!", intents=intents)
-COGS = ["cogs.exchange", "cogs.vouch", "cogs.moderation"]
+# Rate limits longer than this are raised as discord.RateLimited instead of
+# slept through inside discord.py, so utils.scheduler can pause the route and
+# keep other routes moving (discord.py enforces a minimum of 30 s)
+bot = commands.Bot(command_prefix="!", intents=intents,
+                   max_ratelimit_timeout=float(get_config().get("max-ratelimit-timeout", 30)))
+COGS = ["cogs.exchange", "cogs.vouch", "cogs.moderation", "cogs.transcripts"]
+
+_warm_up: Optional[asyncio.Task] = None
+
+
+async def warm_up():
+    """Load the ticket database and the ledger while the gateway connects,
+    so the first interactions after a restart do not wait for them."""
+    from utils import ledger
+    from utils.async_database import get_total, run_io
+    try:
+        t = time.perf_counter()
+        await get_total()
+        startup.record("warm database", t)
+        t = time.perf_counter()
+        await run_io(ledger.count)
+        startup.record("warm ledger", t)
+    except Exception as e:
+        print(f"[Startup Error] warm-up failed: {e}")
 
 
 @bot.event
 async def on_ready():
-    cfg = load_config()
+    cfg = get_config()
     print(f"✅ Logged in as {bot.user} (ID: {bot.user.id})")
+    startup.mark("first READY")
 
-    # Sync slash commands
-    guild = discord.Object(id=int(cfg["guild-id"]))
-    bot.tree.copy_global_to(guild=guild)
-    synced = await bot.tree.sync(guild=guild)
-    print(f"   Synced {len(synced)} slash commands")
+    # Sync slash commands — skipped on reconnects and when nothing changed
+    guild  = discord.Object(id=settings().guild_id)
+    synced = await command_sync.sync_guild(bot.tree, guild, force="--force-sync" in sys.argv)
+    if synced is not None:
+        print(f"   Synced {synced} slash commands")
+    else:
+        print("   Slash commands unchanged, sync skipped")
+    startup.mark("command sync")
 
     await bot.change_presence(
         activity=discord.CustomActivity(name=cfg.get("bot-status", ".gg/Exchora"))
     )
 
+    if _warm_up is not None:
+        await asyncio.wait([_warm_up])
+    startup.finish()
+
 
 async def main():
-    cfg = load_config()
-    token = cfg.get("token", "")
+    global _warm_up
+    token = settings().token
     if not token or token == "YOUR_BOT_TOKEN_HERE":
         print("❌ ERROR: Set your bot token in config.json!")
         return
+    startup.mark("config")
 
     async with bot:
         # Load cogs first
@@ -54,15 +88,22 @@ async def main():
                 print(f"   ✅ Loaded: {cog}")
             except Exception as e:
                 print(f"   ❌ Failed {cog}: {e}")
+            startup.mark(f"load {cog}")
 
         # Register persistent views AFTER cogs are loaded
         # Import here so cogs are already in memory
-        from cogs.exchange import ExchangePanelView, TicketControlView
-        bot.add_view(ExchangePanelView())
-        bot.add_view(TicketControlView())
+        from cogs import exchange
+        bot.add_view(exchange.ExchangePanelView())
+        bot.add_view(exchange.TicketControlView())
+        bot.add_dynamic_items(exchange.SendMethodSelect, exchange.PayPalTypeSelect, exchange.CryptoCoinSelect,
+                              exchange.ReceiveMethodSelect, exchange.ConfirmButton, exchange.CancelButton)
         print("   ✅ Persistent views registered")
+        startup.mark("views")
 
-        await bot.start(token)
+        _warm_up = asyncio.create_task(warm_up())
+        await bot.login(token)
+        startup.mark("login")
+        await bot.connect()
 
 
 if __name__ == "__main__":
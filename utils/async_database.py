@@ -0,0 +1,119 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from utils import database
+
+# Async front-end for utils.database. Every call runs on one dedicated I/O
+# thread, so file/SQLite work never blocks the gateway loop and mutations
+# are applied in the order they were awaited.
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-io")
+
+_locks: dict[str, asyncio.Lock] = {}
+_waiters: dict[str, int] = {}
+
+
+async def run_io(fn, *args, **kwargs):
+    """Run a blocking callable on the database I/O thread."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(fn, *args, **kwargs))
+
+
+@asynccontextmanager
+async def lock(key: str):
+    """Per-key asyncio lock for read-modify-write sequences.
+
+    Locks are created on demand and dropped once nobody holds or waits on
+    them, so the table only ever contains keys that are in use.
+    """
+    lk = _locks.get(key)
+    if lk is None:
+        lk = _locks[key] = asyncio.Lock()
+    _waiters[key] = _waiters.get(key, 0) + 1
+    try:
+        async with lk:
+            yield
+    finally:
+        _waiters[key] -= 1
+        if not _waiters[key]:
+            del _waiters[key]
+            _locks.pop(key, None)
+
+
+def ticket_lock(channel_id: int):
+    return lock(f"ticket:{channel_id}")
+
+
+# ── Tickets ───────────────────────────────────────────────────
+
+async def set_ticket(channel_id: int, data: dict):
+    await run_io(database.set_ticket, channel_id, data)
+
+
+async def get_ticket(channel_id: int) -> Optional[dict]:
+    return await run_io(database.get_ticket, channel_id)
+
+
+async def delete_ticket(channel_id: int):
+    await run_io(database.delete_ticket, channel_id)
+
+
+async def list_tickets(status: Optional[str] = None) -> dict[int, dict]:
+    return await run_io(database.list_tickets, status)
+
+
+async def find_tickets(**filters) -> dict[int, dict]:
+    """Filter by user_id, claimed_by and/or status; see database.find_tickets."""
+    return await run_io(database.find_tickets, **filters)
+
+
+# ── Vouches ───────────────────────────────────────────────────
+
+async def add_vouch(vouch: dict) -> int:
+    return await run_io(database.add_vouch, vouch)
+
+
+async def get_vouches(user_id: int) -> list:
+    return await run_io(database.get_vouches, user_id)
+
+
+async def get_recent_vouches(user_id: int, limit: int = 5) -> list:
+    return await run_io(database.get_recent_vouches, user_id, limit)
+
+
+async def get_vouch_stats(user_id: int) -> dict:
+    return await run_io(database.get_vouch_stats, user_id)
+
+
+# ── Total ─────────────────────────────────────────────────────
+
+async def add_to_total(amount: float) -> float:
+    return await run_io(database.add_to_total, amount)
+
+
+async def get_total() -> float:
+    return await run_io(database.get_total)
+
+
+# ── Blacklist ─────────────────────────────────────────────────
+
+async def is_blacklisted(user_id: int) -> bool:
+    return await run_io(database.is_blacklisted, user_id)
+
+
+async def add_blacklist(user_id: int):
+    await run_io(database.add_blacklist, user_id)
+
+
+async def remove_blacklist(user_id: int):
+    await run_io(database.remove_blacklist, user_id)
+
+
+async def add_blacklist_many(user_ids) -> list:
+    return await run_io(database.add_blacklist_many, list(user_ids))
+
+
+async def remove_blacklist_many(user_ids) -> list:
+    return await run_io(database.remove_blacklist_many, list(user_ids))
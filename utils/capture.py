@@ -0,0 +1,108 @@
+import json
+from pathlib import Path
+from typing import Iterator, Optional
+
+# Live per-ticket capture logs. While a ticket is open, every message, edit
+# and delete in its channel is appended to data/captures/<channel_id>.jsonl
+# as one JSON line, so closing the ticket only has to replay the log instead
+# of paging through the whole channel history. A {"op": "gap"} line marks a
+# period the bot was offline; transcripts fill it from channel history.
+
+CAPTURE_DIR = Path(__file__).parent.parent / "data" / "captures"
+
+_active: Optional[set[int]] = None
+
+
+def _path(channel_id: int) -> Path:
+    return CAPTURE_DIR / f"{channel_id}.jsonl"
+
+
+def _append(channel_id: int, entry: dict):
+    with open(_path(channel_id), "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def active_channels() -> set[int]:
+    global _active
+    if _active is None:
+        _active = {int(p.stem) for p in CAPTURE_DIR.glob("*.jsonl")} if CAPTURE_DIR.exists() else set()
+    return _active
+
+
+def is_active(channel_id: int) -> bool:
+    return channel_id in active_channels()
+
+
+# ── Writers ───────────────────────────────────────────────────
+
+def start(channel_id: int):
+    """Begin capturing a freshly created ticket channel."""
+    CAPTURE_DIR.mkdir(parents=True, exist_ok=True)
+    _append(channel_id, {"op": "start"})
+    active_channels().add(channel_id)
+
+
+def add_message(channel_id: int, rec: dict):
+    if is_active(channel_id):
+        _append(channel_id, {"op": "msg", "rec": rec})
+
+
+def add_edit(channel_id: int, rec: dict):
+    if is_active(channel_id):
+        _append(channel_id, {"op": "edit", "rec": rec})
+
+
+def add_delete(channel_id: int, message_id: int):
+    if is_active(channel_id):
+        _append(channel_id, {"op": "del", "id": message_id})
+
+
+def mark_gaps():
+    """Mark every live log as possibly missing messages (called on READY)."""
+    for channel_id in active_channels():
+        _append(channel_id, {"op": "gap"})
+
+
+def discard(channel_id: int):
+    active_channels().discard(channel_id)
+    _path(channel_id).unlink(missing_ok=True)
+
+
+# ── Readers ───────────────────────────────────────────────────
+
+def iter_log(channel_id: int) -> Iterator[dict]:
+    with open(_path(channel_id), "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                break  # torn final line
+
+
+def scan(channel_id: int) -> dict:
+    """First pass over a log: latest edit per message, deleted IDs, and gaps.
+
+    `gaps` has one entry per gap marker in log order: (after_id, before_id)
+    bounds for a history fetch (either may be None), or None for a marker
+    that repeats an already-open gap.
+    """
+    edits, deleted, gaps = {}, set(), []
+    last_id, open_gap = None, None
+    for entry in iter_log(channel_id):
+        op = entry["op"]
+        if op == "msg":
+            last_id = entry["rec"]["id"]
+            if open_gap is not None:
+                gaps[open_gap] = (gaps[open_gap][0], last_id)
+                open_gap = None
+        elif op == "edit":
+            edits[entry["rec"]["id"]] = entry["rec"]
+        elif op == "del":
+            deleted.add(entry["id"])
+        elif op == "gap":
+            if open_gap is None:
+                open_gap = len(gaps)
+                gaps.append((last_id, None))
+            else:
+                gaps.append(None)
+    return {"edits": edits, "deleted": deleted, "gaps": gaps}
@@ -0,0 +1,173 @@
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Optional
+
+import discord
+
+from utils import scheduler
+from utils.config_loader import get_config
+
+# Ticket category allocator. Discord caps a category at 50 channels, so a
+# ticket goes into the first category of its chain with room: the primary
+# category, then the configured overflow categories, then overflow
+# categories the bot created itself ("<primary name> 2", "… 3", …, listed in
+# data/overflow_categories.json). Channel counts are kept in memory, seeded
+# from the cache on first use and kept current by the channel create,
+# delete and update events. A slot is reserved while its channel is being
+# created or moved, so concurrent tickets cannot overfill a category.
+# cleanup() deletes bot-created overflow categories once they are empty.
+
+STATE_PATH = Path(__file__).parent.parent / "data" / "overflow_categories.json"
+
+CATEGORY_LIMIT = 50
+
+_counts: dict[int, int] = {}            # category ID → channels in it
+_reserved: dict[int, int] = {}          # category ID → creates/moves in flight
+_created: Optional[dict[str, list[int]]] = None   # primary ID → bot-created overflow IDs
+_lock: Optional[asyncio.Lock] = None
+
+
+def _load() -> dict[str, list[int]]:
+    global _created
+    if _created is None:
+        _created = {}
+        if STATE_PATH.exists():
+            with open(STATE_PATH, "r", encoding="utf-8") as f:
+                _created = json.load(f)
+    return _created
+
+
+def _save():
+    STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = STATE_PATH.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(_load(), f)
+    os.replace(tmp, STATE_PATH)
+
+
+def _get_lock() -> asyncio.Lock:
+    global _lock
+    if _lock is None:
+        _lock = asyncio.Lock()
+    return _lock
+
+
+def _load_of(cat: discord.CategoryChannel) -> int:
+    if cat.id not in _counts:
+        _counts[cat.id] = len(cat.channels)
+    return _counts[cat.id] + _reserved.get(cat.id, 0)
+
+
+def _chain(guild: discord.Guild, primary_id: int, overflow: tuple = ()) -> list[discord.CategoryChannel]:
+    ids = [primary_id, *overflow, *_load().get(str(primary_id), [])]
+    return [c for c in (guild.get_channel(int(i)) for i in dict.fromkeys(ids))
+            if isinstance(c, discord.CategoryChannel)]
+
+
+async def _create_overflow(guild: discord.Guild, primary: discord.CategoryChannel) -> discord.CategoryChannel:
+    created = _load().setdefault(str(primary.id), [])
+    taken   = {getattr(guild.get_channel(i), "name", None) for i in created}
+    name    = next(f"{primary.name} {n}" for n in range(2, len(created) + 3) if f"{primary.name} {n}" not in taken)
+    cat     = await scheduler.run(
+        lambda: guild.create_category(name, overwrites=primary.overwrites, position=primary.position + len(created) + 1),
+        f"guild-channels:{guild.id}", scheduler.PRIORITY_NORMAL)
+    created.append(cat.id)
+    _save()
+    _counts[cat.id] = 0
+    return cat
+
+
+@asynccontextmanager
+async def slot(guild: discord.Guild, primary_id: Optional[int], overflow: tuple = ()):
+    """Reserve room for one channel in primary_id's chain and yield the
+    category to create it in (or move it to). Yields None when there is no
+    primary category or the chain is full and may not grow."""
+    primary = guild.get_channel(int(primary_id)) if primary_id else None
+    if not isinstance(primary, discord.CategoryChannel):
+        yield None
+        return
+
+    async with _get_lock():
+        cat = next((c for c in _chain(guild, primary.id, overflow) if _load_of(c) < CATEGORY_LIMIT), None)
+        if cat is None and len(_load().get(str(primary.id), [])) < int(get_config().get("category-overflow-max", 5)):
+            try:
+                cat = await _create_overflow(guild, primary)
+            except discord.HTTPException as e:
+                print(f"[Category Error] could not create an overflow for {primary.name}: {e}")
+        if cat is not None:
+            _reserved[cat.id] = _reserved.get(cat.id, 0) + 1
+    try:
+        yield cat
+    finally:
+        if cat is not None:
+            _reserved[cat.id] -= 1
+
+
+# ── Gateway events ────────────────────────────────────────────
+
+def _adjust(category_id: Optional[int], delta: int):
+    if category_id in _counts:
+        _counts[category_id] += delta
+
+
+def channel_created(channel: discord.abc.GuildChannel):
+    _adjust(channel.category_id, 1)
+
+
+def channel_deleted(channel: discord.abc.GuildChannel):
+    if isinstance(channel, discord.CategoryChannel):
+        _counts.pop(channel.id, None)
+        for ids in _load().values():
+            if channel.id in ids:
+                ids.remove(channel.id)
+                _save()
+        return
+    _adjust(channel.category_id, -1)
+
+
+def channel_updated(before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
+    if before.category_id != after.category_id:
+        _adjust(before.category_id, -1)
+        _adjust(after.category_id, 1)
+
+
+# ── Cleanup ───────────────────────────────────────────────────
+
+async def cleanup(guild: discord.Guild) -> int:
+    """Delete empty bot-created overflow categories, newest first, as long
+    as the rest of their chain keeps a fifth of a category free. Returns how
+    many were deleted."""
+    deleted = 0
+    for primary_id, ids in list(_load().items()):
+        for cat_id in reversed(list(ids)):
+            cat = guild.get_channel(cat_id)
+            if not isinstance(cat, discord.CategoryChannel):
+                continue
+            async with _get_lock():
+                others = [c for c in _chain(guild, int(primary_id)) if c.id != cat_id]
+                free   = sum(CATEGORY_LIMIT - _load_of(c) for c in others)
+                if _load_of(cat) or free < CATEGORY_LIMIT // 5:
+                    continue
+                try:
+                    await scheduler.run(lambda: cat.delete(reason="Empty ticket overflow category"),
+                                        f"guild-channels:{guild.id}", scheduler.PRIORITY_HOUSEKEEPING)
+                except discord.NotFound:
+                    pass
+                channel_deleted(cat)
+                deleted += 1
+    return deleted
+
+
+async def cleanup_loop(bot: discord.Client):
+    """Background task: run cleanup() every category-cleanup-interval seconds."""
+    await bot.wait_until_ready()
+    while True:
+        await asyncio.sleep(float(get_config().get("category-cleanup-interval", 900)))
+        for guild in bot.guilds:
+            try:
+                await cleanup(guild)
+            except Exception as e:
+                print(f"[Category Error] cleanup failed: {e}")
@@ -0,0 +1,65 @@
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+# Persisted ticket-close jobs. A close is split into stages (see STAGES); the
+# job records the last finished stage in data/close_jobs.json, rewritten
+# atomically after every stage, so after a crash or restart the close
+# resumes where it stopped. Every stage is safe to run twice.
+
+JOBS_PATH = Path(__file__).parent.parent / "data" / "close_jobs.json"
+
+STAGES = ("transcript", "log", "ledger", "channel", "finish")
+
+_jobs: Optional[dict[str, dict]] = None
+
+
+def _load() -> dict[str, dict]:
+    global _jobs
+    if _jobs is None:
+        _jobs = {}
+        if JOBS_PATH.exists():
+            with open(JOBS_PATH, "r", encoding="utf-8") as f:
+                _jobs = json.load(f)
+    return _jobs
+
+
+def _save():
+    JOBS_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = JOBS_PATH.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(_load(), f, ensure_ascii=False)
+    os.replace(tmp, JOBS_PATH)
+
+
+def create(job: dict) -> dict:
+    """Persist a new job keyed by its channel; `done` starts empty."""
+    job.setdefault("done", [])
+    _load()[str(job["channel_id"])] = job
+    _save()
+    return dict(job)
+
+
+def get(channel_id: int) -> Optional[dict]:
+    job = _load().get(str(channel_id))
+    return dict(job) if job else None
+
+
+def mark_done(channel_id: int, stage: str, **fields):
+    """Record a finished stage (plus any fields later stages need)."""
+    job = _load()[str(channel_id)]
+    job.update(fields)
+    if stage not in job["done"]:
+        job["done"].append(stage)
+    _save()
+
+
+def remove(channel_id: int):
+    if _load().pop(str(channel_id), None) is not None:
+        _save()
+
+
+def pending() -> list[dict]:
+    """Unfinished jobs, oldest first."""
+    return sorted((dict(j) for j in _load().values()), key=lambda j: j["closed_at"])
@@ -0,0 +1,60 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+import discord
+from discord import app_commands
+
+# Slash-command sync guard. on_ready fires again after every gateway
+# reconnect, and each tree.sync() is a rate-limited REST call. The command
+# tree is hashed (the same payload sync() would upload) and the hash of the
+# last successful sync per guild is kept in data/command_sync.json; a sync
+# only happens when the hash differs, at most once per process, or when the
+# bot is started with --force-sync.
+
+STATE_PATH = Path(__file__).parent.parent / "data" / "command_sync.json"
+
+_synced: set[int] = set()   # guilds already handled by this process
+
+
+def _load() -> dict:
+    if STATE_PATH.exists():
+        with open(STATE_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def _save(state: dict):
+    STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = STATE_PATH.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, STATE_PATH)
+
+
+def fingerprint(tree: app_commands.CommandTree, guild: discord.abc.Snowflake) -> str:
+    """Stable hash of the commands registered for guild."""
+    payload = sorted((cmd.to_dict(tree) for cmd in tree.get_commands(guild=guild)),
+                     key=lambda c: (c.get("type", 1), c["name"]))
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+async def sync_guild(tree: app_commands.CommandTree, guild: discord.abc.Snowflake,
+                     force: bool = False) -> Optional[int]:
+    """Copy the global commands to guild and sync them if anything changed.
+    Returns the number of synced commands, or None if the sync was skipped."""
+    if guild.id in _synced:
+        return None
+    tree.copy_global_to(guild=guild)
+    digest = fingerprint(tree, guild)
+    state  = _load()
+    if not force and state.get(str(guild.id)) == digest:
+        _synced.add(guild.id)
+        return None
+    synced = await tree.sync(guild=guild)
+    state[str(guild.id)] = digest
+    _save(state)
+    _synced.add(guild.id)
+    return len(synced)
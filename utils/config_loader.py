@@ -1,14 +1,101 @@
 import json
-import os
 from pathlib import Path
+from typing import Optional
 
-_config = None
+# config.json is compiled once into a Config: ID lists become frozensets and
+# the per-method "<Method>-Category" / "<Method>-Ping" keys become dicts, so
+# permission checks and ticket routing are set and dict lookups. The raw dict
+# stays available through get_config() for plain settings. The fee table is
+# compiled here too, so an invalid one is rejected like any other bad key.
+# reload_config() builds a new Config and swaps it in with one assignment; if
+# the file is invalid the running config is kept.
+
+CONFIG_PATH = Path(__file__).parent.parent / "config.json"
+
+_current: Optional[tuple[dict, "Config"]] = None
+
+
+class Config:
+    __slots__ = ("raw", "token", "guild_id", "staff", "exchangers", "categories", "pings", "overflow", "fees",
+                 "_ids")
+
+    def __init__(self, raw: dict):
+        self.raw        = raw
+        self.token      = raw.get("token", "")
+        self.guild_id   = raw["guild-id"]
+        self._ids       = {k: frozenset(v) for k, v in raw.items() if isinstance(v, list)
+                           and all(isinstance(x, int) for x in v)}
+        self.staff      = self.ids("ids-to-have-full-access-in-tickets")
+        self.exchangers = self.ids("exchangers")
+        self.categories = {k[:-len("-Category")]: v for k, v in raw.items() if k.endswith("-Category") and v}
+        self.pings      = {k[:-len("-Ping")]: v for k, v in raw.items() if k.endswith("-Ping") and v}
+        # "ticket-overflow-categories" list, then the older numbered keys
+        numbered        = sorted((int(k.rsplit("-", 1)[1]), v) for k, v in raw.items()
+                                 if k.startswith("ticket-overflow-") and k.rsplit("-", 1)[1].isdigit() and v)
+        self.overflow   = tuple(raw.get("ticket-overflow-categories") or ()) + tuple(v for _, v in numbered)
+        self.fees       = _compile_fees(raw)
+
+    def ids(self, key: str) -> frozenset:
+        """The user/role IDs listed under key (empty if unset)."""
+        return self._ids.get(key, frozenset())
+
+    def allows(self, member, key: str) -> bool:
+        """Whether member, or one of their roles, is listed under key."""
+        allowed = self.ids(key)
+        return member.id in allowed or any(r.id in allowed for r in getattr(member, "roles", ()))
+
+
+def _no_duplicates(pairs: list) -> dict:
+    seen = {}
+    for key, value in pairs:
+        if key in seen:
+            raise ValueError(f"duplicate key {key!r}")
+        seen[key] = value
+    return seen
+
+
+def _compile_fees(raw: dict):
+    from utils import fees  # fees reads the config through this module
+    return fees.compile_schedule(raw.get("fee-table") or fees.DEFAULT_FEE_TABLE,
+                                 raw.get("fee-default-percent", fees.DEFAULT_PERCENT))
+
+
+def _validate(raw: dict):
+    if not isinstance(raw.get("guild-id"), int):
+        raise ValueError("'guild-id' must be an integer")
+    for key, value in raw.items():
+        if key.startswith("-"):
+            continue  # section headers
+        if key.endswith(("-id", "-Category", "-Ping")) and not (value is None or isinstance(value, int)):
+            raise ValueError(f"{key!r} must be an ID or null, got {value!r}")
+        if key.startswith("ids-") and not (isinstance(value, list) and all(isinstance(x, int) for x in value)):
+            raise ValueError(f"{key!r} must be a list of IDs")
+
+
+def _read() -> tuple[dict, Config]:
+    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+        raw = json.load(f, object_pairs_hook=_no_duplicates)
+    _validate(raw)
+    return raw, Config(raw)
 
 
 def get_config() -> dict:
-    global _config
-    if _config is None:
-        path = Path(__file__).parent.parent / "config.json"
-        with open(path, "r", encoding="utf-8") as f:
-            _config = json.load(f)
-    return _config
+    global _current
+    if _current is None:
+        _current = _read()
+    return _current[0]
+
+
+def settings() -> Config:
+    global _current
+    if _current is None:
+        _current = _read()
+    return _current[1]
+
+
+def reload_config() -> Config:
+    """Re-read config.json and swap it in. Raises (keeping the running
+    config) if the file is unreadable or invalid."""
+    global _current
+    _current = _read()
+    return _current[1]
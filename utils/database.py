@@ -1,65 +1,288 @@
+import atexit
 import json
+import os
+import threading
+import time
 from pathlib import Path
 from typing import Optional
 
-DB_PATH = Path(__file__).parent.parent / "data" / "database.json"
+from utils.config_loader import get_config
+
+DB_PATH      = Path(__file__).parent.parent / "data" / "database.json"
+JOURNAL_PATH = DB_PATH.with_suffix(".journal")
+
+# The JSON store keeps the whole dataset in memory. Every mutation is appended
+# to JOURNAL_PATH as one JSON line; database.json is only rewritten as an
+# atomic snapshot every SNAPSHOT_EVERY mutations / SNAPSHOT_INTERVAL seconds
+# (and on shutdown), after which the journal is truncated.
+SNAPSHOT_EVERY    = int(get_config().get("database-snapshot-every", 500))
+SNAPSHOT_INTERVAL = float(get_config().get("database-snapshot-interval", 300))
+
+_db: Optional[dict] = None
+_ticket_index: Optional[dict[str, dict]] = None
+_vouch_index: Optional[dict[str, list]] = None
+_vouch_stats: Optional[dict[str, dict]] = None
+_journal = None
+_pending_ops   = 0
+_last_snapshot = time.monotonic()
+_lock = threading.RLock()
+
+
+def _empty() -> dict:
+    return {"tickets": {}, "vouches": [], "total_exchanged": 0.0, "blacklist": []}
 
 
 def _load() -> dict:
-    if not DB_PATH.exists():
+    global _db
+    if _db is not None:
+        return _db
+    with _lock:
+        if _db is not None:
+            return _db
         DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-        data = {"tickets": {}, "vouches": [], "total_exchanged": 0.0, "blacklist": []}
-        _save(data)
-        return data
-    with open(DB_PATH, "r", encoding="utf-8") as f:
-        return json.load(f)
+        if DB_PATH.exists():
+            with open(DB_PATH, "r", encoding="utf-8") as f:
+                _db = json.load(f)
+        else:
+            _db = _empty()
+        # Held as a set in memory for O(1) lookups; snapshots store a sorted list
+        _db["blacklist"] = set(_db.get("blacklist", []))
+        journalled = JOURNAL_PATH.exists() and JOURNAL_PATH.stat().st_size > 0
+        _replay_journal(_db)
+        # Snapshot and truncate whenever the journal has any bytes, even if
+        # nothing replayed: new appends must never land after a torn line
+        if journalled or not DB_PATH.exists():
+            _save(_db)
+        _build_ticket_index(_db)
+        _build_vouch_index(_db)
+        return _db
 
 
 def _save(data: dict):
-    with open(DB_PATH, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    """Atomically snapshot `data` to DB_PATH and truncate the journal."""
+    global _journal, _pending_ops, _last_snapshot
+    with _lock:
+        tmp = DB_PATH.with_suffix(".json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False, default=_json_default)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, DB_PATH)
+
+        if _journal is not None:
+            _journal.close()
+        _journal = open(JOURNAL_PATH, "w", encoding="utf-8")
+        _pending_ops   = 0
+        _last_snapshot = time.monotonic()
+
+
+def _json_default(obj):
+    if isinstance(obj, set):
+        return sorted(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def flush():
+    """Write a snapshot now if there are journalled changes."""
+    with _lock:
+        if _db is not None and _pending_ops:
+            _save(_db)
+
+
+# ── Journal ───────────────────────────────────────────────────
+
+def _apply(db: dict, op: str, args: list):
+    if op == "set_ticket":
+        _unindex_ticket(args[0], db["tickets"].get(args[0]))
+        db["tickets"][args[0]] = args[1]
+        _index_ticket(args[0], args[1])
+    elif op == "delete_ticket":
+        _unindex_ticket(args[0], db["tickets"].pop(args[0], None))
+    elif op == "add_vouch":
+        db["vouches"].append(args[0])
+        _index_vouch(args[0])
+    elif op == "set_total":
+        db["total_exchanged"] = args[0]
+    elif op == "blacklist_add":
+        db["blacklist"].update(args)
+    elif op == "blacklist_remove":
+        db["blacklist"].difference_update(args)
+    else:
+        raise ValueError(f"Unknown journal op {op!r}")
+
+
+def _replay_journal(db: dict) -> int:
+    if not JOURNAL_PATH.exists():
+        return 0
+    count = 0
+    with open(JOURNAL_PATH, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # Torn final line from a crash mid-append — everything before it is intact
+                break
+            _apply(db, entry["op"], entry["args"])
+            count += 1
+    return count
+
+
+def _mutate(op: str, *args):
+    """Journal a mutation, then apply it to the in-memory dataset."""
+    global _journal, _pending_ops
+    with _lock:
+        db = _load()
+        if _journal is None:
+            _journal = open(JOURNAL_PATH, "a", encoding="utf-8")
+        _journal.write(json.dumps({"op": op, "args": list(args)}, ensure_ascii=False) + "\n")
+        _journal.flush()
+        _apply(db, op, list(args))
+        _pending_ops += 1
+        if _pending_ops >= SNAPSHOT_EVERY or time.monotonic() - _last_snapshot >= SNAPSHOT_INTERVAL:
+            _save(db)
+        return db
 
 
 # ── Tickets ───────────────────────────────────────────────────
 
+# Secondary indexes: field → value → channel IDs, for the fields below, so
+# per-user, per-claimer and per-status lookups touch only matching tickets.
+# Unclaimed tickets are indexed under claimed_by None.
+
+_TICKET_INDEXED = ("user_id", "claimed_by", "status")
+
+
+def _index_key(value) -> Optional[str]:
+    return str(value) if value is not None else None
+
+
+def _index_ticket(cid: str, ticket: Optional[dict]):
+    if _ticket_index is None or ticket is None:
+        return  # still loading — _build_ticket_index covers it
+    for field in _TICKET_INDEXED:
+        _ticket_index[field].setdefault(_index_key(ticket.get(field)), set()).add(cid)
+
+
+def _unindex_ticket(cid: str, ticket: Optional[dict]):
+    if _ticket_index is None or ticket is None:
+        return
+    for field in _TICKET_INDEXED:
+        key = _index_key(ticket.get(field))
+        ids = _ticket_index[field].get(key)
+        if ids is not None:
+            ids.discard(cid)
+            if not ids:
+                del _ticket_index[field][key]
+
+
+def _build_ticket_index(db: dict):
+    global _ticket_index
+    _ticket_index = {field: {} for field in _TICKET_INDEXED}
+    for cid, ticket in db["tickets"].items():
+        _index_ticket(cid, ticket)
+
+
 def set_ticket(channel_id: int, data: dict):
-    db = _load()
-    db["tickets"][str(channel_id)] = data
-    _save(db)
+    _mutate("set_ticket", str(channel_id), dict(data))
 
 
 def get_ticket(channel_id: int) -> Optional[dict]:
-    db = _load()
-    return db["tickets"].get(str(channel_id))
+    ticket = _load()["tickets"].get(str(channel_id))
+    return dict(ticket) if ticket is not None else None
 
 
 def delete_ticket(channel_id: int):
-    db = _load()
-    db["tickets"].pop(str(channel_id), None)
-    _save(db)
+    _mutate("delete_ticket", str(channel_id))
+
+
+def list_tickets(status: Optional[str] = None) -> dict[int, dict]:
+    """All stored tickets (optionally only one status), keyed by channel ID."""
+    if status is not None:
+        return find_tickets(status=status)
+    return {int(cid): dict(t) for cid, t in _load()["tickets"].items()}
+
+
+_ANY = object()
+
+
+def find_tickets(user_id=_ANY, claimed_by=_ANY, status=_ANY) -> dict[int, dict]:
+    """Tickets matching every given field, keyed by channel ID, read from the
+    secondary indexes. claimed_by=None matches unclaimed tickets."""
+    with _lock:
+        tickets = _load()["tickets"]
+        sets = [_ticket_index[field].get(_index_key(value), set())
+                for field, value in (("user_id", user_id), ("claimed_by", claimed_by), ("status", status))
+                if value is not _ANY]
+        if not sets:
+            return {int(cid): dict(t) for cid, t in tickets.items()}
+        ids = set.intersection(*sorted(sets, key=len))
+        return {int(cid): dict(tickets[cid]) for cid in ids}
 
 
 # ── Vouches ───────────────────────────────────────────────────
 
+# Vouches are indexed per target together with running aggregates, so stats
+# are O(1) and recent entries O(k) however long the global list gets.
+
+def _empty_stats() -> dict:
+    return {"count": 0, "rating_sum": 0, "histogram": [0, 0, 0, 0, 0]}
+
+
+def _index_vouch(vouch: dict):
+    if _vouch_index is None:
+        return  # still loading — _build_vouch_index covers it
+    target = str(vouch.get("target"))
+    _vouch_index.setdefault(target, []).append(vouch)
+    stats  = _vouch_stats.setdefault(target, _empty_stats())
+    rating = int(vouch.get("rating", 0))
+    stats["count"]      += 1
+    stats["rating_sum"] += rating
+    if 1 <= rating <= 5:
+        stats["histogram"][rating - 1] += 1
+
+
+def _build_vouch_index(db: dict):
+    global _vouch_index, _vouch_stats
+    _vouch_index, _vouch_stats = {}, {}
+    for v in db["vouches"]:
+        _index_vouch(v)
+
+
 def add_vouch(vouch: dict) -> int:
-    db = _load()
-    db["vouches"].append(vouch)
-    _save(db)
+    db = _mutate("add_vouch", dict(vouch))
     return len(db["vouches"])
 
 
 def get_vouches(user_id: int) -> list:
-    db = _load()
-    return [v for v in db["vouches"] if v.get("target") == str(user_id)]
+    _load()
+    return list(_vouch_index.get(str(user_id), []))
+
+
+def get_recent_vouches(user_id: int, limit: int = 5) -> list:
+    """Newest-first list of at most `limit` vouches for a user."""
+    _load()
+    return _vouch_index.get(str(user_id), [])[-limit:][::-1] if limit > 0 else []
+
+
+def get_vouch_stats(user_id: int) -> dict:
+    """count, rating_sum, average and 1–5 star histogram for a user."""
+    _load()
+    stats = _vouch_stats.get(str(user_id)) or _empty_stats()
+    return {
+        "count":      stats["count"],
+        "rating_sum": stats["rating_sum"],
+        "average":    stats["rating_sum"] / stats["count"] if stats["count"] else 0.0,
+        "histogram":  list(stats["histogram"]),
+    }
 
 
 # ── Total ─────────────────────────────────────────────────────
 
 def add_to_total(amount: float) -> float:
-    db = _load()
-    db["total_exchanged"] = round(db.get("total_exchanged", 0.0) + amount, 2)
-    _save(db)
-    return db["total_exchanged"]
+    with _lock:
+        total = round(_load().get("total_exchanged", 0.0) + amount, 2)
+        _mutate("set_total", total)
+    return total
 
 
 def get_total() -> float:
@@ -69,17 +292,61 @@ def get_total() -> float:
 # ── Blacklist ─────────────────────────────────────────────────
 
 def is_blacklisted(user_id: int) -> bool:
-    return str(user_id) in _load().get("blacklist", [])
+    return str(user_id) in _load()["blacklist"]
 
 
 def add_blacklist(user_id: int):
-    db = _load()
-    if str(user_id) not in db.get("blacklist", []):
-        db.setdefault("blacklist", []).append(str(user_id))
-    _save(db)
+    add_blacklist_many([user_id])
 
 
 def remove_blacklist(user_id: int):
-    db = _load()
-    db["blacklist"] = [x for x in db.get("blacklist", []) if x != str(user_id)]
-    _save(db)
+    remove_blacklist_many([user_id])
+
+
+def add_blacklist_many(user_ids) -> list:
+    """Blacklist many users with one journal entry. Returns the newly added IDs."""
+    with _lock:
+        current = _load()["blacklist"]
+        new = list(dict.fromkeys(str(u) for u in user_ids if str(u) not in current))
+        if new:
+            _mutate("blacklist_add", *new)
+        return new
+
+
+def remove_blacklist_many(user_ids) -> list:
+    """Unblacklist many users with one journal entry. Returns the removed IDs."""
+    with _lock:
+        current = _load()["blacklist"]
+        gone = list(dict.fromkeys(str(u) for u in user_ids if str(u) in current))
+        if gone:
+            _mutate("blacklist_remove", *gone)
+        return gone
+
+
+# ── Backend selection ─────────────────────────────────────────
+# "json" (default) keeps everything in data/database.json. "sqlite" stores
+# the same data in data/database.sqlite3 (WAL mode); the JSON file is
+# imported once the first time the SQLite database is opened.
+
+BACKEND = str(get_config().get("database-backend", "json")).lower()
+
+_PUBLIC = (
+    "set_ticket", "get_ticket", "delete_ticket", "list_tickets", "find_tickets",
+    "add_vouch", "get_vouches", "get_recent_vouches", "get_vouch_stats",
+    "add_to_total", "get_total",
+    "is_blacklisted", "add_blacklist", "remove_blacklist",
+    "add_blacklist_many", "remove_blacklist_many",
+)
+
+if BACKEND == "sqlite":
+    from utils import sqlite_store as _sqlite
+
+    if JOURNAL_PATH.exists() and JOURNAL_PATH.stat().st_size:
+        _load()  # fold any unsnapshotted journal into database.json before migrating
+    _sqlite.open_db(migrate_from=DB_PATH)
+    for _name in _PUBLIC:
+        globals()[_name] = getattr(_sqlite, _name)
+elif BACKEND == "json":
+    atexit.register(flush)
+else:
+    raise ValueError(f"Unknown database-backend {BACKEND!r} (expected 'json' or 'sqlite')")
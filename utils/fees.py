@@ -1,4 +1,131 @@
-from typing import Optional
+from bisect import bisect_right
+from typing import NamedTuple, Optional, Sequence
+
+from utils.config_loader import settings
+
+# Fee schedule. Overridable with a "fee-table" list in config.json; each rule
+# applies to what the user SENDS:
+#   send      payment method (required)
+#   detail    PayPal type / coin — rule only applies to that detail
+#   receive   receive method — pair rule, checked before any send-only rule
+#   percent   flat percentage, or
+#   tiers     [[upper, percent], ..., [null, percent]] — `upper` is exclusive
+#   min-fee   minimum fee amount (+ min-fee-note shown when it kicks in)
+#   note      note shown on every quote using this rule
+#   label     /fees row title (rules without a label are not listed)
+#   display   extra text appended to the /fees row
+DEFAULT_FEE_TABLE = [
+    {"send": "PayPal", "detail": "PayPal Balance", "tiers": [[10, 10.0], [100, 8.0], [None, 7.0]],
+     "label": "💙 PayPal Balance → Anything"},
+    {"send": "PayPal", "detail": "Card", "percent": 15.0, "label": "💙 PayPal Card → Anything"},
+    {"send": "PayPal", "percent": 10.0},
+    {"send": "Crypto", "percent": 0.0, "note": "Crypto to other method (0% fee)",
+     "label": "🪙 Crypto → Other Methods"},
+    {"send": "Crypto", "receive": "Crypto", "percent": 3.0, "note": "Crypto to Crypto exchange",
+     "label": "🪙 Crypto → Crypto"},
+    {"send": "CashApp", "percent": 10.0, "min-fee": 3.0, "min-fee-note": "Minimum fee of $3 applied",
+     "label": "💚 CashApp → Anything", "display": "(min. $3, USD only)"},
+    {"send": "Revolut", "percent": 10.0, "label": "🔵 Revolut → Anything"},
+    {"send": "Venmo", "percent": 10.0, "label": "💜 Venmo → Anything"},
+    {"send": "Zelle", "percent": 10.0, "label": "💛 Zelle → Anything"},
+    {"send": "Wise", "percent": 10.0, "label": "🟢 Wise → Anything"},
+    {"send": "Bank Transfer", "percent": 10.0, "label": "🏦 Bank Transfer → Anything"},
+    {"send": "Skrill", "percent": 10.0, "label": "🔴 Skrill → Anything"},
+    {"send": "Paysafe", "tiers": [[50, 25.0], [100, 20.0], [None, 17.0]], "label": "🟠 Paysafe → Anything"},
+    {"send": "Amazon", "percent": 35.0, "label": "🟡 Amazon → Anything"},
+    {"send": "Apple Pay", "percent": 25.0, "label": "🍎 Apple Pay → Anything"},
+    {"send": "Wunschgutschein", "percent": 45.0, "label": "🎁 Wunschgutschein → Anything"},
+]
+DEFAULT_PERCENT = 5.0
+
+
+class FeeRule(NamedTuple):
+    bounds: tuple          # exclusive tier upper bounds, ascending
+    percents: tuple        # len(bounds) + 1 percentages
+    min_fee: float
+    min_fee_note: str
+    note: str
+
+    def percent(self, amount: float) -> float:
+        return self.percents[bisect_right(self.bounds, amount)]
+
+
+class FeeSchedule(NamedTuple):
+    pairs: dict            # (send, receive)       → FeeRule
+    methods: dict          # (send, detail | None) → FeeRule
+    default: FeeRule
+    rows: list             # (label, text) for /fees
+
+    def rule(self, send_method: str, send_detail: Optional[str], receive_method: Optional[str]) -> FeeRule:
+        m = send_method.strip()
+        return (
+            (receive_method is not None and self.pairs.get((m, receive_method.strip())))
+            or self.methods.get((m, (send_detail or "").strip() or None))
+            or self.methods.get((m, None))
+            or self.default
+        )
+
+
+def _fmt(n: float) -> str:
+    return f"{n:g}"
+
+
+def compile_schedule(table: Sequence[dict], default_percent: float = DEFAULT_PERCENT) -> FeeSchedule:
+    """Validate a fee table and compile it into lookup dicts + tier arrays.
+    Raises ValueError if the table is malformed."""
+    if not isinstance(table, list):
+        raise ValueError("fee-table must be a list of rules")
+    try:
+        return _compile(table, float(default_percent))
+    except ValueError as e:
+        raise ValueError(f"fee-table: {e}") from e
+    except (KeyError, TypeError, IndexError) as e:
+        raise ValueError(f"fee-table: malformed rule ({type(e).__name__}: {e})") from e
+
+
+def _compile(table: list, default_percent: float) -> FeeSchedule:
+    pairs, methods, rows = {}, {}, []
+    for spec in table:
+        if "tiers" in spec:
+            tiers = spec["tiers"]
+            if not tiers or tiers[-1][0] is not None:
+                raise ValueError(f"last tier of {spec['send']} must have upper bound null")
+            bounds   = tuple(float(t[0]) for t in tiers[:-1])
+            percents = tuple(float(t[1]) for t in tiers)
+            if list(bounds) != sorted(bounds):
+                raise ValueError(f"tiers of {spec['send']} must be ascending")
+            text = " | ".join(
+                f"Under €{_fmt(bounds[0])}: **{_fmt(p)}%**" if i == 0 else
+                f"€{_fmt(bounds[i - 1])}+: **{_fmt(p)}%**" if i == len(bounds) else
+                f"€{_fmt(bounds[i - 1])}–{_fmt(bounds[i] - 1)}: **{_fmt(p)}%**"
+                for i, p in enumerate(percents)
+            )
+        else:
+            bounds, percents = (), (float(spec["percent"]),)
+            text = f"**{_fmt(percents[0])}%**"
+
+        rule = FeeRule(bounds, percents, float(spec.get("min-fee", 0.0)),
+                       spec.get("min-fee-note", ""), spec.get("note", ""))
+        if "receive" in spec:
+            pairs[(spec["send"], spec["receive"])] = rule
+        else:
+            methods[(spec["send"], spec.get("detail"))] = rule
+        if spec.get("label"):
+            rows.append((spec["label"], f"{text} {spec['display']}" if spec.get("display") else text))
+
+    default = FeeRule((), (default_percent,), 0.0, "", "")
+    return FeeSchedule(pairs, methods, default, rows)
+
+
+def get_schedule() -> FeeSchedule:
+    """The compiled fee table. It is built with the Config, so a bad table
+    fails at startup or /reload-config rather than on the first quote."""
+    return settings().fees
+
+
+def fee_table_rows() -> list[tuple[str, str]]:
+    """(title, text) rows for the /fees embed, in table order."""
+    return get_schedule().rows
 
 
 def get_fee_percent(send_method: str, send_detail: Optional[str], amount: float) -> float:
@@ -6,53 +133,7 @@ def get_fee_percent(send_method: str, send_detail: Optional[str], amount: float)
     Returns fee percentage based on the SEND method and amount.
     Fees are always calculated on what the user SENDS.
     """
-    m = send_method.strip()
-    d = (send_detail or "").strip()
-
-    if m == "PayPal":
-        if d == "PayPal Balance":
-            if amount < 10:
-                return 10.0
-            elif amount < 100:
-                return 8.0
-            else:
-                return 7.0
-        if d == "Card":
-            return 15.0
-        # fallback if no detail
-        return 10.0
-
-    if m == "CashApp":
-        return 10.0
-    if m == "Revolut":
-        return 10.0
-    if m == "Venmo":
-        return 10.0
-    if m == "Zelle":
-        return 10.0
-    if m == "Wise":
-        return 10.0
-    if m == "Bank Transfer":
-        return 10.0
-    if m == "Skrill":
-        return 10.0
-
-    if m == "Paysafe":
-        if amount < 50:
-            return 25.0
-        elif amount < 100:
-            return 20.0
-        else:
-            return 17.0
-
-    if m == "Amazon":
-        return 35.0
-    if m == "Apple Pay":
-        return 25.0
-    if m == "Wunschgutschein":
-        return 45.0
-
-    return 5.0
+    return get_schedule().rule(send_method, send_detail, None).percent(amount)
 
 
 def calculate_fee(
@@ -66,23 +147,15 @@ def calculate_fee(
     Returns full fee breakdown dict:
       percent, fee, receive, send_amount, note
     """
-    note = ""
-
-    if send_method == "Crypto" and receive_method == "Crypto":
-        percent = 3.0
-        note = "Crypto to Crypto exchange"
-    elif send_method == "Crypto":
-        percent = 0.0
-        note = "Crypto to other method (0% fee)"
-    else:
-        percent = get_fee_percent(send_method, send_detail, amount)
+    rule    = get_schedule().rule(send_method, send_detail, receive_method)
+    percent = rule.percent(amount)
+    note    = rule.note
 
     fee_amount = round(amount * percent / 100, 2)
 
-    # CashApp minimum $3
-    if send_method == "CashApp" and fee_amount < 3.0:
-        fee_amount = 3.0
-        note = "Minimum fee of $3 applied"
+    if fee_amount < rule.min_fee:
+        fee_amount = rule.min_fee
+        note = rule.min_fee_note
 
     return {
         "percent": percent,
@@ -91,3 +164,59 @@ def calculate_fee(
         "send_amount": amount,
         "note": note,
     }
+
+
+# ── Batch quoting ─────────────────────────────────────────────
+
+def quote_batch(
+    send_methods: Sequence[str],
+    send_details: Sequence[Optional[str]],
+    amounts: Sequence[float],
+    receive_methods: Optional[Sequence[Optional[str]]] = None,
+    schedule: Optional[FeeSchedule] = None,
+) -> dict:
+    """Quote many rows at once, e.g. to reprice historical tickets.
+
+    Columns are parallel sequences; pass a `schedule` from compile_schedule()
+    to see what a changed fee table would have charged. Rows sharing a rule
+    are priced together — with NumPy installed via searchsorted over the
+    tier bounds, otherwise in a plain loop. Returns {"percent", "fee",
+    "receive"} as NumPy arrays or lists respectively.
+    """
+    schedule = schedule or get_schedule()
+    n = len(amounts)
+    receive_methods = receive_methods if receive_methods is not None else [None] * n
+
+    groups: dict[FeeRule, list[int]] = {}
+    cache: dict[tuple, FeeRule] = {}
+    for i in range(n):
+        key  = (send_methods[i], send_details[i], receive_methods[i])
+        rule = cache.get(key)
+        if rule is None:
+            rule = cache[key] = schedule.rule(*key)
+        groups.setdefault(rule, []).append(i)
+
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+
+    if np is None:
+        percent, fee = [0.0] * n, [0.0] * n
+        for rule, idx in groups.items():
+            for i in idx:
+                p = rule.percent(amounts[i])
+                percent[i] = p
+                fee[i] = max(round(amounts[i] * p / 100, 2), rule.min_fee)
+        return {"percent": percent, "fee": fee,
+                "receive": [round(a - f, 2) for a, f in zip(amounts, fee)]}
+
+    amt     = np.asarray(amounts, dtype=float)
+    percent = np.empty(n)
+    fee     = np.empty(n)
+    for rule, idx in groups.items():
+        idx = np.asarray(idx)
+        p = np.asarray(rule.percents)[np.searchsorted(rule.bounds, amt[idx], side="right")]
+        percent[idx] = p
+        fee[idx] = np.maximum(np.round(amt[idx] * p / 100, 2), rule.min_fee)
+    return {"percent": percent, "fee": fee, "receive": np.round(amt - fee, 2)}
@@ -0,0 +1,191 @@
+import json
+import os
+from array import array
+from bisect import bisect_left, bisect_right
+from decimal import ROUND_HALF_UP, Decimal
+from pathlib import Path
+from typing import Optional
+
+# Append-only exchange ledger. Every completed close adds one fixed-width row,
+# stored column by column in data/ledger/<column>.i64 (native-endian int64,
+# read and written with the array module). Money is kept in integer cents so
+# totals never drift. Payment methods are stored as small codes listed in
+# methods.json. meta.json holds the legacy float total at the time the ledger
+# was created, so /total keeps counting exchanges from before the ledger.
+# The files are in append order, which is not always close-time order
+# (concurrent close workers, resumed jobs); in memory the rows are kept
+# sorted by ts so time ranges can be binary searched.
+
+LEDGER_DIR   = Path(__file__).parent.parent / "data" / "ledger"
+METHODS_PATH = LEDGER_DIR / "methods.json"
+META_PATH    = LEDGER_DIR / "meta.json"
+
+COLUMNS = ("ts", "channel", "user", "claimer", "send", "receive", "amount", "fee", "received")
+
+_cols: Optional[dict[str, array]] = None
+_channels: set[int] = set()
+_methods: list[str] = []
+_codes: dict[str, int] = {}
+_baseline = 0
+
+
+def to_cents(value) -> int:
+    return int((Decimal(str(value)) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def format_cents(cents: int) -> str:
+    return f"€{cents // 100:,}.{cents % 100:02d}" if cents >= 0 else "-" + format_cents(-cents)
+
+
+def _path(col: str) -> Path:
+    return LEDGER_DIR / f"{col}.i64"
+
+
+def _write_json(path: Path, data):
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _load() -> dict[str, array]:
+    global _cols, _methods, _codes, _baseline, _channels
+    if _cols is not None:
+        return _cols
+
+    LEDGER_DIR.mkdir(parents=True, exist_ok=True)
+    if not META_PATH.exists():
+        from utils import database
+        _write_json(META_PATH, {"baseline_cents": to_cents(database.get_total())})
+    with open(META_PATH, "r", encoding="utf-8") as f:
+        _baseline = json.load(f)["baseline_cents"]
+    if METHODS_PATH.exists():
+        with open(METHODS_PATH, "r", encoding="utf-8") as f:
+            _methods = json.load(f)
+    _codes = {m: i for i, m in enumerate(_methods)}
+
+    cols = {}
+    for col in COLUMNS:
+        arr = array("q")
+        path = _path(col)
+        if path.exists():
+            with open(path, "rb") as f:
+                data = f.read()
+            arr.frombytes(data[:len(data) - len(data) % arr.itemsize])
+        cols[col] = arr
+
+    # A crash mid-append can leave some columns one row longer than others
+    rows = min(len(a) for a in cols.values())
+    for col, arr in cols.items():
+        del arr[rows:]
+        path = _path(col)
+        if path.exists() and path.stat().st_size != rows * arr.itemsize:
+            with open(path, "r+b") as f:
+                f.truncate(rows * arr.itemsize)
+
+    ts = cols["ts"]
+    if any(ts[i] > ts[i + 1] for i in range(rows - 1)):
+        order = sorted(range(rows), key=ts.__getitem__)
+        cols  = {col: array("q", (arr[i] for i in order)) for col, arr in cols.items()}
+    _channels = set(cols["channel"])
+    _cols = cols
+    return _cols
+
+
+def _code(method: Optional[str]) -> int:
+    method = method or "?"
+    if method not in _codes:
+        _codes[method] = len(_methods)
+        _methods.append(method)
+        _write_json(METHODS_PATH, _methods)
+    return _codes[method]
+
+
+# ── Writing ───────────────────────────────────────────────────
+
+def record(ts: float, channel_id: int, user_id: int, claimer_id: Optional[int],
+           send_method: str, receive_method: str, amount: float, fee: float, received: float) -> int:
+    """Append one completed exchange. Returns its row number in ts order.
+    Raises ValueError, before anything is written, if a value cannot be stored."""
+    cols = _load()
+    try:
+        values = [int(ts), int(channel_id), int(user_id), int(claimer_id or 0), 0, 0,
+                  to_cents(amount), to_cents(fee), to_cents(received)]
+        packed = array("q", values)  # OverflowError outside int64
+    except (ArithmeticError, TypeError, ValueError) as e:
+        raise ValueError(f"ledger row not representable: {e}") from e
+    packed[4], packed[5] = _code(send_method), _code(receive_method)
+
+    # Every column gets the row or none does: a failed write is cut back off
+    sizes = {col: len(cols[col]) * packed.itemsize for col in COLUMNS}
+    try:
+        for i, col in enumerate(COLUMNS):
+            with open(_path(col), "ab") as f:
+                packed[i:i + 1].tofile(f)
+    except OSError:
+        for col, size in sizes.items():
+            path = _path(col)
+            if path.exists() and path.stat().st_size > size:
+                with open(path, "r+b") as f:
+                    f.truncate(size)
+        raise
+
+    at = bisect_right(cols["ts"], packed[0])  # the end, unless an earlier close finished late
+    for i, col in enumerate(COLUMNS):
+        cols[col].insert(at, packed[i])
+    _channels.add(packed[1])
+    return at
+
+
+# ── Column scans ──────────────────────────────────────────────
+
+def count() -> int:
+    return len(_load()["ts"])
+
+
+def _range(since: Optional[float], until: Optional[float]) -> tuple[int, int]:
+    ts = _load()["ts"]
+    lo = bisect_left(ts, int(since)) if since is not None else 0
+    hi = bisect_right(ts, int(until)) if until is not None else len(ts)
+    return lo, hi
+
+
+def total_cents() -> int:
+    """All-time exchanged amount, including the pre-ledger baseline."""
+    amounts = _load()["amount"]  # sets _baseline on first use
+    return _baseline + sum(amounts)
+
+
+def sum_column(col: str, since: Optional[float] = None, until: Optional[float] = None) -> int:
+    lo, hi = _range(since, until)
+    return sum(_load()[col][lo:hi])
+
+
+def sums_by(key: str, col: str = "amount", since: Optional[float] = None,
+            until: Optional[float] = None) -> dict:
+    """{key value → sum of col}; key is "send", "receive", "user" or "claimer".
+    Method codes are resolved back to method names."""
+    cols   = _load()
+    lo, hi = _range(since, until)
+    sums: dict[int, int] = {}
+    for k, v in zip(cols[key][lo:hi], cols[col][lo:hi]):
+        sums[k] = sums.get(k, 0) + v
+    if key in ("send", "receive"):
+        return {_methods[k]: v for k, v in sums.items()}
+    return sums
+
+
+def rows(since: Optional[float] = None, until: Optional[float] = None):
+    """Yield ledger rows as dicts (method names resolved, money in cents)."""
+    cols   = _load()
+    lo, hi = _range(since, until)
+    for i in range(lo, hi):
+        row = {col: cols[col][i] for col in COLUMNS}
+        row["send"], row["receive"] = _methods[row["send"]], _methods[row["receive"]]
+        yield row
+
+
+def has_channel(channel_id: int) -> bool:
+    """Whether a close of this ticket channel is already recorded."""
+    _load()
+    return int(channel_id) in _channels
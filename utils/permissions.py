@@ -0,0 +1,85 @@
+from typing import Optional
+
+from utils.config_loader import Config, settings
+
+# Cached permission resolver. A member's capabilities are resolved once into
+# a bitmask (user ID and role IDs against the config's ID sets) and cached
+# per (guild, member), so a check on the interaction path is one dict lookup
+# and a bit test. The cache is dropped for one member on on_member_update,
+# for the holders of a role when it is edited or deleted, and completely when
+# /reload-config swaps in a new Config.
+
+STAFF     = 1 << 0
+EXCHANGER = 1 << 1
+BLACKLIST = 1 << 2
+ROLE_GIVE = 1 << 3
+MIDDLEMAN = 1 << 4
+
+# Capability → config key listing the user/role IDs that grant it
+CAPABILITY_KEYS = {
+    STAFF:     "ids-to-have-full-access-in-tickets",
+    EXCHANGER: "exchangers",
+    BLACKLIST: "blacklist",
+    ROLE_GIVE: "role-give",
+}
+_BY_KEY = {key: cap for cap, key in CAPABILITY_KEYS.items()}
+
+_cache: dict[tuple[int, int], int] = {}
+_holders: dict[int, set[tuple[int, int]]] = {}   # role ID → cache keys that used it
+_built_for: Optional[Config] = None
+
+
+def _resolve(member, conf: Config) -> int:
+    ids  = {member.id} | {r.id for r in getattr(member, "roles", ())}
+    mask = 0
+    for cap, key in CAPABILITY_KEYS.items():
+        if not ids.isdisjoint(conf.ids(key)):
+            mask |= cap
+    if conf.raw.get("middleman-role-id") in ids:
+        mask |= MIDDLEMAN
+    return mask
+
+
+def capabilities(member) -> int:
+    """The member's capability bitmask, cached."""
+    global _built_for
+    conf = settings()
+    if conf is not _built_for:
+        invalidate_all()
+        _built_for = conf
+    guild = getattr(member, "guild", None)
+    if guild is None:
+        return _resolve(member, conf)   # DM user: no roles to cache against
+    key  = (guild.id, member.id)
+    mask = _cache.get(key)
+    if mask is None:
+        mask = _cache[key] = _resolve(member, conf)
+        for role in member.roles:
+            _holders.setdefault(role.id, set()).add(key)
+    return mask
+
+
+def has(member, capability: int) -> bool:
+    return bool(capabilities(member) & capability)
+
+
+def allows(member, key: str) -> bool:
+    """Like Config.allows(), cached for the keys that map to a capability."""
+    cap = _BY_KEY.get(key)
+    return has(member, cap) if cap else settings().allows(member, key)
+
+
+# ── Invalidation ──────────────────────────────────────────────
+
+def invalidate_member(guild_id: int, member_id: int):
+    _cache.pop((guild_id, member_id), None)
+
+
+def invalidate_role(role_id: int):
+    for key in _holders.pop(role_id, ()):
+        _cache.pop(key, None)
+
+
+def invalidate_all():
+    _cache.clear()
+    _holders.clear()
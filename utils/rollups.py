@@ -0,0 +1,160 @@
+import asyncio
+import atexit
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+from utils.config_loader import get_config
+
+# Time-bucket rollups for /stats. Each closed ticket bumps one hourly and one
+# daily bucket in data/rollups.json; a bucket maps a series key to counters
+# [completed, cancelled, volume cents, fee cents]. Series keys: "*" for all
+# tickets, "m:<send method>" and "x:<claimer id>". Any window is answered by
+# summing whole days plus the hourly buckets at its two ragged edges.
+# Closes only update the buckets in memory; flush_loop() writes the file
+# every rollups-flush-interval seconds when something changed, and again at
+# exit. Counts lost to a crash can be restored with `rebuild`.
+
+ROLLUPS_PATH = Path(__file__).parent.parent / "data" / "rollups.json"
+
+HOUR, DAY = 3600, 86400
+HOURLY_RETENTION = 32 * DAY
+
+_data: Optional[dict] = None
+_dirty = False
+
+
+def _load() -> dict:
+    global _data
+    if _data is None:
+        _data = {"h": {}, "d": {}}
+        if ROLLUPS_PATH.exists():
+            with open(ROLLUPS_PATH, "r", encoding="utf-8") as f:
+                _data = json.load(f)
+    return _data
+
+
+def _save():
+    ROLLUPS_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = ROLLUPS_PATH.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(_load(), f, separators=(",", ":"))
+    os.replace(tmp, ROLLUPS_PATH)
+
+
+def _bump(data: dict, ts: float, completed: bool, send_method: Optional[str],
+          claimer_id: Optional[int], amount_cents: int, fee_cents: int):
+    keys = ["*", f"m:{send_method or '?'}"] + ([f"x:{int(claimer_id)}"] if claimer_id else [])
+    for res, width in (("h", HOUR), ("d", DAY)):
+        bucket = data[res].setdefault(str(int(ts) // width * width), {})
+        for key in keys:
+            c = bucket.setdefault(key, [0, 0, 0, 0])
+            c[0 if completed else 1] += 1
+            c[2] += amount_cents
+            c[3] += fee_cents
+
+
+def _expire(data: dict, now: float):
+    cutoff = now - HOURLY_RETENTION
+    for start in [s for s in data["h"] if int(s) < cutoff]:
+        del data["h"][start]
+
+
+def record(ts: float, status: str, send_method: Optional[str], claimer_id: Optional[int],
+           amount_cents: int = 0, fee_cents: int = 0):
+    """Count one closed ticket (status "completed" or "cancelled")."""
+    global _dirty
+    data = _load()
+    _bump(data, ts, status == "completed", send_method, claimer_id, amount_cents, fee_cents)
+    _expire(data, time.time())
+    _dirty = True
+
+
+def flush():
+    """Write data/rollups.json if any close was counted since the last write."""
+    global _dirty
+    if _dirty:
+        _dirty = False
+        _save()
+
+
+async def flush_loop(bot):
+    """Background task: flush() every rollups-flush-interval seconds."""
+    from utils.async_database import run_io
+    await bot.wait_until_ready()
+    while True:
+        await asyncio.sleep(float(get_config().get("rollups-flush-interval", 60)))
+        try:
+            await run_io(flush)
+        except Exception as e:
+            print(f"[Rollups Error] flush failed: {e}")
+
+
+# ── Queries ───────────────────────────────────────────────────
+
+def _buckets(since: float, until: float) -> list[dict]:
+    """Buckets covering [since, until): full days from the daily series,
+    the partial days at either end from the hourly series."""
+    data  = _load()
+    first = -(-int(since) // DAY) * DAY     # first midnight at or after since
+    last  = int(until) // DAY * DAY         # last midnight at or before until
+    if first >= last:
+        spans = [(int(since) // HOUR * HOUR, until, "h", HOUR)]
+    else:
+        spans = [(int(since) // HOUR * HOUR, first, "h", HOUR),
+                 (first, last, "d", DAY),
+                 (last, until, "h", HOUR)]
+    out = []
+    for lo, hi, res, width in spans:
+        series = data[res]
+        for start in range(lo, int(hi), width):
+            bucket = series.get(str(start))
+            if bucket:
+                out.append(bucket)
+    return out
+
+
+def query(since: float, until: Optional[float] = None) -> dict:
+    """Summed counters per series key over [since, until)."""
+    until = time.time() if until is None else until
+    sums: dict[str, list[int]] = {}
+    for bucket in _buckets(since, until):
+        for key, c in bucket.items():
+            s = sums.setdefault(key, [0, 0, 0, 0])
+            for i in range(4):
+                s[i] += c[i]
+    return sums
+
+
+# ── Rebuild ───────────────────────────────────────────────────
+
+def rebuild() -> int:
+    """Recompute every bucket from stored history: completed exchanges from
+    the ledger, cancelled tickets from the transcript archive manifest.
+    Returns the number of tickets counted."""
+    global _data, _dirty
+    from utils import ledger, transcript_archive
+
+    data, n = {"h": {}, "d": {}}, 0
+    for row in ledger.rows():
+        _bump(data, row["ts"], True, row["send"], row["claimer"], row["amount"], row["fee"])
+        n += 1
+    for entry in transcript_archive.find(status="cancelled"):
+        _bump(data, entry["closed_at"], False, entry.get("send_method"), entry.get("claimed_by"), 0, 0)
+        n += 1
+    _expire(data, time.time())
+    _data, _dirty = data, False
+    _save()
+    return n
+
+
+atexit.register(flush)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] != ["rebuild"]:
+        sys.exit("usage: python -m utils.rollups rebuild")
+    print(f"Rebuilt rollups from {rebuild()} closed tickets → {ROLLUPS_PATH}")
@@ -0,0 +1,171 @@
+import asyncio
+import bisect
+import itertools
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+import discord
+
+from utils.config_loader import get_config
+
+# Outbound Discord action scheduler. Cogs submit REST calls as zero-argument
+# factories tagged with a route and a priority. A route names the resource a
+# call is limited on, e.g. "messages:<channel id>"; it follows the major
+# parameter of Discord's buckets rather than the exact bucket hash. Calls on
+# different routes run concurrently, calls on the same route run one at a
+# time in priority order. discord.py sleeps through short 429s itself; one
+# longer than the Bot's max_ratelimit_timeout (set in main.py) is raised as
+# RateLimited, and the route is then paused for the retry-after (doubling on
+# repeats) without holding back other routes.
+
+PRIORITY_USER         = 0   # replies and messages a user is waiting on
+PRIORITY_NORMAL       = 1   # ticket moves, permission changes
+PRIORITY_HOUSEKEEPING = 2   # log channel posts, channel renames
+
+_PRIORITY_NAMES = {PRIORITY_USER: "user", PRIORITY_NORMAL: "normal", PRIORITY_HOUSEKEEPING: "housekeeping"}
+
+MAX_ATTEMPTS = 3
+
+
+class _Job:
+    __slots__ = ("priority", "seq", "route", "factory", "future", "queued_at", "attempts")
+
+    def __init__(self, priority, seq, route, factory, future):
+        self.priority  = priority
+        self.seq       = seq
+        self.route     = route
+        self.factory   = factory
+        self.future    = future
+        self.queued_at = time.monotonic()
+        self.attempts  = 0
+
+    def __lt__(self, other: "_Job") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+_jobs: list[_Job] = []                  # kept sorted by (priority, seq)
+_busy: set[str] = set()                 # routes with a call in flight
+_cooldown: dict[str, float] = {}        # route → monotonic time it may run again
+_backoff: dict[str, float] = {}         # route → last pause length
+_workers: list[asyncio.Task] = []
+_wake: Optional[asyncio.Event] = None
+_seq = itertools.count()
+_stats = {"completed": 0, "failed": 0, "rate_limited": 0, "peak_depth": 0, "wait_ms_total": 0.0}
+
+
+# ── Workers ───────────────────────────────────────────────────
+
+def _next_job() -> Optional[_Job]:
+    now = time.monotonic()
+    for i, job in enumerate(_jobs):
+        if job.route in _busy:
+            continue
+        until = _cooldown.get(job.route)
+        if until is not None:
+            if until > now:
+                continue
+            del _cooldown[job.route]
+        return _jobs.pop(i)
+    return None
+
+
+def _pause(route: str, retry_after: Optional[float]):
+    delay = retry_after if retry_after else min(_backoff.get(route, 0.5) * 2, 60.0)
+    _backoff[route]  = delay
+    _cooldown[route] = time.monotonic() + delay
+    asyncio.get_running_loop().call_later(delay, _wake.set)
+
+
+async def _worker():
+    while True:
+        job = _next_job()
+        if job is None:
+            _wake.clear()
+            await _wake.wait()
+            continue
+        if job.future.done():
+            continue  # cancelled while queued
+
+        _busy.add(job.route)
+        job.attempts += 1
+        if job.attempts == 1:
+            _stats["wait_ms_total"] += (time.monotonic() - job.queued_at) * 1000
+        try:
+            result = await job.factory()
+        except (discord.RateLimited, discord.HTTPException) as e:
+            limited = isinstance(e, discord.RateLimited) or e.status == 429
+            if limited:
+                _stats["rate_limited"] += 1
+                _pause(job.route, getattr(e, "retry_after", None))
+            if limited and job.attempts < MAX_ATTEMPTS and not job.future.done():
+                bisect.insort(_jobs, job)
+            else:
+                _stats["failed"] += 1
+                if not job.future.done():  # else cancelled by the caller, e.g. wait_for
+                    job.future.set_exception(e)
+        except Exception as e:
+            _stats["failed"] += 1
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            _stats["completed"] += 1
+            _backoff.pop(job.route, None)
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            _busy.discard(job.route)
+            _wake.set()
+
+
+def _ensure_workers():
+    global _wake
+    if _wake is None:
+        _wake = asyncio.Event()
+    _workers[:] = [t for t in _workers if not t.done()]
+    for _ in range(max(1, int(get_config().get("scheduler-concurrency", 8))) - len(_workers)):
+        _workers.append(asyncio.create_task(_worker()))
+
+
+def _log_failure(future: asyncio.Future):
+    # Only for fire-and-forget jobs; run() callers handle their own errors
+    if not future.cancelled() and future.exception():
+        print(f"[Scheduler Error] {future.exception()}")
+
+
+# ── Public API ────────────────────────────────────────────────
+
+def submit(factory: Callable[[], Awaitable[Any]], route: str, priority: int = PRIORITY_NORMAL,
+           awaited: bool = False) -> asyncio.Future:
+    """Queue one Discord call. `factory` is called (possibly again after a 429)
+    to produce the awaitable. Returns a future with its result. Failures are
+    logged unless `awaited` says the caller awaits the future and handles them."""
+    _ensure_workers()
+    future = asyncio.get_running_loop().create_future()
+    if not awaited:
+        future.add_done_callback(_log_failure)
+    bisect.insort(_jobs, _Job(priority, next(_seq), route, factory, future))
+    _stats["peak_depth"] = max(_stats["peak_depth"], len(_jobs))
+    _wake.set()
+    return future
+
+
+async def run(factory: Callable[[], Awaitable[Any]], route: str, priority: int = PRIORITY_USER) -> Any:
+    """submit() and wait for the result; failures are raised to the caller."""
+    return await submit(factory, route, priority, awaited=True)
+
+
+def metrics() -> dict:
+    now = time.monotonic()
+    started = _stats["completed"] + _stats["failed"]
+    return {
+        "queued": len(_jobs),
+        "queued_by_priority": {name: sum(1 for j in _jobs if j.priority == p) for p, name in _PRIORITY_NAMES.items()},
+        "in_flight": len(_busy),
+        "paused_routes": sum(1 for t in _cooldown.values() if t > now),
+        "oldest_wait_s": round(now - min((j.queued_at for j in _jobs), default=now), 1),
+        "avg_wait_ms": round(_stats["wait_ms_total"] / started, 1) if started else 0.0,
+        "completed": _stats["completed"],
+        "failed": _stats["failed"],
+        "rate_limited": _stats["rate_limited"],
+        "peak_depth": _stats["peak_depth"],
+    }
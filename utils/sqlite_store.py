@@ -0,0 +1,372 @@
+import json
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+SQLITE_PATH = Path(__file__).parent.parent / "data" / "database.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tickets (
+    channel_id  TEXT PRIMARY KEY,
+    user_id     TEXT,
+    status      TEXT,
+    claimed_by  TEXT,
+    created_at  REAL,
+    data        TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tickets_status ON tickets (status);
+CREATE INDEX IF NOT EXISTS idx_tickets_user ON tickets (user_id, status);
+CREATE INDEX IF NOT EXISTS idx_tickets_claimer ON tickets (claimed_by, status);
+CREATE TABLE IF NOT EXISTS vouches (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    from_id     TEXT,
+    target      TEXT NOT NULL,
+    rating      INTEGER NOT NULL,
+    comment     TEXT,
+    timestamp   REAL
+);
+CREATE INDEX IF NOT EXISTS idx_vouches_target ON vouches (target, id);
+CREATE TABLE IF NOT EXISTS vouch_stats (
+    target      TEXT PRIMARY KEY,
+    count       INTEGER NOT NULL,
+    rating_sum  INTEGER NOT NULL,
+    r1          INTEGER NOT NULL DEFAULT 0,
+    r2          INTEGER NOT NULL DEFAULT 0,
+    r3          INTEGER NOT NULL DEFAULT 0,
+    r4          INTEGER NOT NULL DEFAULT 0,
+    r5          INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS blacklist (
+    user_id     TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS totals (
+    name        TEXT PRIMARY KEY,
+    value       REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key         TEXT PRIMARY KEY,
+    value       TEXT
+);
+"""
+
+_conn: Optional[sqlite3.Connection] = None
+_lock = threading.RLock()
+# Hashed mirror of the blacklist table so the hottest lookup skips SQL entirely
+_blacklist: set = set()
+
+
+def open_db(path: Path = SQLITE_PATH, migrate_from: Optional[Path] = None) -> sqlite3.Connection:
+    """Open (or create) the SQLite database in WAL mode.
+
+    If `migrate_from` points at an existing database.json and this database
+    has never been migrated, its contents are imported once.
+    """
+    global _conn
+    with _lock:
+        if _conn is not None:
+            return _conn
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.executescript(_SCHEMA)
+        _conn = conn
+        if migrate_from is not None and migrate_from.exists() and not _meta("migrated_from_json"):
+            migrate_from_json(migrate_from)
+        if not _meta("vouch_stats_built") or not conn.execute(
+                "SELECT 1 FROM totals WHERE name = 'vouch_count'").fetchone():
+            _rebuild_vouch_stats()
+        _blacklist.clear()
+        _blacklist.update(r[0] for r in conn.execute("SELECT user_id FROM blacklist"))
+        return conn
+
+
+def _db() -> sqlite3.Connection:
+    return _conn if _conn is not None else open_db()
+
+
+@contextmanager
+def _tx():
+    """BEGIN IMMEDIATE … COMMIT, rolling back on error."""
+    with _lock:
+        conn = _db()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+def _meta(key: str) -> Optional[str]:
+    row = _db().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def _ticket_row(channel_id: int, data: dict) -> tuple:
+    claimed_by = data.get("claimed_by")
+    return (
+        str(channel_id),
+        str(data["user_id"]) if data.get("user_id") is not None else None,
+        data.get("status"),
+        str(claimed_by) if claimed_by is not None else None,
+        data.get("created_at"),
+        json.dumps(data, ensure_ascii=False),
+    )
+
+
+def _vouch_row(vouch: dict) -> tuple:
+    return (
+        vouch.get("from"),
+        str(vouch.get("target")),
+        int(vouch.get("rating", 0)),
+        vouch.get("comment"),
+        vouch.get("timestamp"),
+    )
+
+
+def _vouch_dict(row) -> dict:
+    return {"from": row[0], "target": row[1], "rating": row[2], "comment": row[3], "timestamp": row[4]}
+
+
+def _rebuild_vouch_stats():
+    """Recompute vouch_stats and the vouch count from the vouches table
+    (one pass, one transaction)."""
+    with _tx() as conn:
+        conn.execute("DELETE FROM vouch_stats")
+        conn.execute(
+            "INSERT INTO vouch_stats "
+            "SELECT target, COUNT(*), SUM(rating), "
+            "SUM(rating = 1), SUM(rating = 2), SUM(rating = 3), SUM(rating = 4), SUM(rating = 5) "
+            "FROM vouches GROUP BY target"
+        )
+        conn.execute("INSERT OR REPLACE INTO totals SELECT 'vouch_count', COUNT(*) FROM vouches")
+        conn.execute("INSERT OR REPLACE INTO meta VALUES ('vouch_stats_built', ?)", (str(time.time()),))
+
+
+# ── Migration ─────────────────────────────────────────────────
+
+def migrate_from_json(json_path: Path, force: bool = False) -> dict:
+    """Import tickets, vouches, blacklist and total from a database.json file.
+
+    Runs in a single transaction. With `force`, existing rows are replaced
+    by the file contents. Returns a summary of imported row counts.
+    """
+    with _lock:
+        conn = _db()
+        if _meta("migrated_from_json") and not force:
+            return {}
+        with open(json_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        tickets   = data.get("tickets", {})
+        vouches   = data.get("vouches", [])
+        blacklist = data.get("blacklist", [])
+
+        with _tx():
+            if force:
+                for table in ("tickets", "vouches", "blacklist", "totals"):
+                    conn.execute(f"DELETE FROM {table}")
+            conn.executemany(
+                "INSERT OR REPLACE INTO tickets VALUES (?, ?, ?, ?, ?, ?)",
+                [_ticket_row(cid, t) for cid, t in tickets.items()],
+            )
+            conn.executemany(
+                "INSERT INTO vouches (from_id, target, rating, comment, timestamp) VALUES (?, ?, ?, ?, ?)",
+                [_vouch_row(v) for v in vouches],
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO blacklist VALUES (?)",
+                [(str(u),) for u in blacklist],
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO totals VALUES ('total_exchanged', ?)",
+                (float(data.get("total_exchanged", 0.0)),),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('migrated_from_json', ?)",
+                (str(time.time()),),
+            )
+
+        _rebuild_vouch_stats()
+        _blacklist.clear()
+        _blacklist.update(r[0] for r in conn.execute("SELECT user_id FROM blacklist"))
+        return {"tickets": len(tickets), "vouches": len(vouches), "blacklist": len(blacklist)}
+
+
+# ── Tickets ───────────────────────────────────────────────────
+
+def set_ticket(channel_id: int, data: dict):
+    with _lock:
+        _db().execute("INSERT OR REPLACE INTO tickets VALUES (?, ?, ?, ?, ?, ?)", _ticket_row(channel_id, data))
+
+
+def get_ticket(channel_id: int) -> Optional[dict]:
+    with _lock:
+        row = _db().execute("SELECT data FROM tickets WHERE channel_id = ?", (str(channel_id),)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def delete_ticket(channel_id: int):
+    with _lock:
+        _db().execute("DELETE FROM tickets WHERE channel_id = ?", (str(channel_id),))
+
+
+def list_tickets(status: Optional[str] = None) -> dict[int, dict]:
+    with _lock:
+        if status is None:
+            rows = _db().execute("SELECT channel_id, data FROM tickets").fetchall()
+        else:
+            rows = _db().execute("SELECT channel_id, data FROM tickets WHERE status = ?", (status,)).fetchall()
+    return {int(cid): json.loads(data) for cid, data in rows}
+
+
+_ANY = object()
+
+
+def find_tickets(user_id=_ANY, claimed_by=_ANY, status=_ANY) -> dict[int, dict]:
+    """Tickets matching every given field; claimed_by=None matches unclaimed."""
+    where, params = [], []
+    for column, value in (("user_id", user_id), ("claimed_by", claimed_by), ("status", status)):
+        if value is _ANY:
+            continue
+        if value is None:
+            where.append(f"{column} IS NULL")
+        else:
+            where.append(f"{column} = ?")
+            params.append(str(value))
+    sql = "SELECT channel_id, data FROM tickets" + (" WHERE " + " AND ".join(where) if where else "")
+    with _lock:
+        rows = _db().execute(sql, params).fetchall()
+    return {int(cid): json.loads(data) for cid, data in rows}
+
+
+# ── Vouches ───────────────────────────────────────────────────
+
+def add_vouch(vouch: dict) -> int:
+    row    = _vouch_row(vouch)
+    target, rating = row[1], row[2]
+    bucket = f"r{rating}" if 1 <= rating <= 5 else None
+    with _tx() as conn:
+        conn.execute(
+            "INSERT INTO vouches (from_id, target, rating, comment, timestamp) VALUES (?, ?, ?, ?, ?)",
+            row,
+        )
+        conn.execute("INSERT OR IGNORE INTO vouch_stats (target, count, rating_sum) VALUES (?, 0, 0)", (target,))
+        conn.execute(
+            "UPDATE vouch_stats SET count = count + 1, rating_sum = rating_sum + ?"
+            + (f", {bucket} = {bucket} + 1" if bucket else "")
+            + " WHERE target = ?",
+            (rating, target),
+        )
+        # A running counter, not lastrowid: ids keep counting after migrate_from_json(force=True)
+        conn.execute("UPDATE totals SET value = value + 1 WHERE name = 'vouch_count'")
+        (total,) = conn.execute("SELECT value FROM totals WHERE name = 'vouch_count'").fetchone()
+    return int(total)
+
+
+def get_vouches(user_id: int) -> list:
+    with _lock:
+        rows = _db().execute(
+            "SELECT from_id, target, rating, comment, timestamp FROM vouches WHERE target = ? ORDER BY id",
+            (str(user_id),),
+        ).fetchall()
+    return [_vouch_dict(r) for r in rows]
+
+
+def get_recent_vouches(user_id: int, limit: int = 5) -> list:
+    with _lock:
+        rows = _db().execute(
+            "SELECT from_id, target, rating, comment, timestamp FROM vouches WHERE target = ? "
+            "ORDER BY id DESC LIMIT ?",
+            (str(user_id), max(limit, 0)),
+        ).fetchall()
+    return [_vouch_dict(r) for r in rows]
+
+
+def get_vouch_stats(user_id: int) -> dict:
+    with _lock:
+        row = _db().execute(
+            "SELECT count, rating_sum, r1, r2, r3, r4, r5 FROM vouch_stats WHERE target = ?",
+            (str(user_id),),
+        ).fetchone()
+    count, rating_sum, *hist = row or (0, 0, 0, 0, 0, 0, 0)
+    return {
+        "count":      count,
+        "rating_sum": rating_sum,
+        "average":    rating_sum / count if count else 0.0,
+        "histogram":  hist,
+    }
+
+
+# ── Total ─────────────────────────────────────────────────────
+
+def add_to_total(amount: float) -> float:
+    with _tx() as conn:
+        row   = conn.execute("SELECT value FROM totals WHERE name = 'total_exchanged'").fetchone()
+        total = round((row[0] if row else 0.0) + amount, 2)
+        conn.execute("INSERT OR REPLACE INTO totals VALUES ('total_exchanged', ?)", (total,))
+    return total
+
+
+def get_total() -> float:
+    with _lock:
+        row = _db().execute("SELECT value FROM totals WHERE name = 'total_exchanged'").fetchone()
+    return row[0] if row else 0.0
+
+
+# ── Blacklist ─────────────────────────────────────────────────
+
+def is_blacklisted(user_id: int) -> bool:
+    _db()
+    return str(user_id) in _blacklist
+
+
+def add_blacklist(user_id: int):
+    add_blacklist_many([user_id])
+
+
+def remove_blacklist(user_id: int):
+    remove_blacklist_many([user_id])
+
+
+def add_blacklist_many(user_ids) -> list:
+    with _lock:
+        _db()
+        new = list(dict.fromkeys(str(u) for u in user_ids if str(u) not in _blacklist))
+        if new:
+            with _tx() as conn:
+                conn.executemany("INSERT OR IGNORE INTO blacklist VALUES (?)", [(u,) for u in new])
+            _blacklist.update(new)
+        return new
+
+
+def remove_blacklist_many(user_ids) -> list:
+    with _lock:
+        _db()
+        gone = list(dict.fromkeys(str(u) for u in user_ids if str(u) in _blacklist))
+        if gone:
+            with _tx() as conn:
+                conn.executemany("DELETE FROM blacklist WHERE user_id = ?", [(u,) for u in gone])
+            _blacklist.difference_update(gone)
+        return gone
+
+
+# ── CLI ───────────────────────────────────────────────────────
+
+if __name__ == "__main__":
+    # python -m utils.sqlite_store migrate [--force]
+    from utils.database import DB_PATH
+
+    if len(sys.argv) < 2 or sys.argv[1] != "migrate":
+        print("Usage: python -m utils.sqlite_store migrate [--force]")
+        sys.exit(1)
+    open_db()
+    summary = migrate_from_json(DB_PATH, force="--force" in sys.argv)
+    print(f"Migrated: {summary}" if summary else "Already migrated (use --force to import again).")
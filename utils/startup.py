@@ -0,0 +1,61 @@
+import json
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+# Startup timeline. main.py marks each phase as it finishes (imports, config,
+# each cog, views, login, first READY, command sync); work that runs
+# alongside those phases, such as warming the data stores, is recorded with
+# its own start time. finish() prints the timeline once and writes it to
+# data/startup_timeline.json, so slow restarts can be compared after a deploy.
+
+TIMELINE_PATH = Path(__file__).parent.parent / "data" / "startup_timeline.json"
+
+_t0: Optional[float] = None
+_last: Optional[float] = None
+_phases: list[dict] = []
+_finished = False
+
+
+def begin(t0: Optional[float] = None):
+    """Start the clock; t0 is a time.perf_counter() value taken earlier."""
+    global _t0, _last
+    _t0 = _last = t0 if t0 is not None else time.perf_counter()
+
+
+def record(phase: str, started: float, ended: Optional[float] = None):
+    """Record a phase that ran from `started` to `ended` (perf_counter values)."""
+    if _finished:
+        return  # e.g. on_ready again after a reconnect
+    if _t0 is None:
+        begin(started)
+    ended = time.perf_counter() if ended is None else ended
+    _phases.append({"phase": phase, "at_ms": round((started - _t0) * 1000, 1),
+                    "ms": round((ended - started) * 1000, 1)})
+
+
+def mark(phase: str):
+    """Record a sequential phase: everything since the previous mark."""
+    global _last
+    now = time.perf_counter()
+    record(phase, _last if _last is not None else now, now)
+    _last = now
+
+
+def finish():
+    """Print the timeline and write it to TIMELINE_PATH (first call only)."""
+    global _finished
+    if _finished or _t0 is None:
+        return
+    _finished = True
+    total = round((time.perf_counter() - _t0) * 1000, 1)
+    print(f"   ⏱️ Startup: {total:.0f} ms")
+    for p in _phases:
+        print(f"      {p['at_ms']:>8.0f} ms  +{p['ms']:>7.0f} ms  {p['phase']}")
+
+    TIMELINE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = TIMELINE_PATH.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"started_at": time.time() - total / 1000, "total_ms": total, "phases": _phases}, f, indent=2)
+    os.replace(tmp, TIMELINE_PATH)
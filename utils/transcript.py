@@ -1,20 +1,165 @@
+import asyncio
 import discord
+import itertools
 import re
-from datetime import datetime
-from pathlib import Path
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Optional
 
-TRANSCRIPT_DIR = Path(__file__).parent.parent / "transcripts"
-TRANSCRIPT_DIR.mkdir(exist_ok=True)
+from utils import capture, transcript_archive, transcript_search
+from utils.async_database import run_io
+from utils.config_loader import get_config
 
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".gif", ".webp")
 
-async def create_transcript(channel: discord.TextChannel, ticket_data: dict) -> Path:
-    messages = []
-    async for msg in channel.history(limit=5000, oldest_first=True):
-        messages.append(msg)
 
-    filename = f"transcript-{channel.name}-{channel.id}.html"
-    filepath = TRANSCRIPT_DIR / filename
+# ── Message records ──────────────────────────────────────────────
+# Rendering works on plain, picklable dicts rather than discord.Message so it
+# can run in a worker thread/process (and on messages captured earlier).
 
+def snapshot_message(msg: discord.Message) -> dict:
+    return {
+        "id":          msg.id,
+        "author":      msg.author.display_name,
+        "avatar":      str(msg.author.display_avatar.url) if msg.author.display_avatar else "",
+        "bot":         msg.author.bot,
+        "created_at":  msg.created_at.timestamp(),
+        "content":     msg.content,
+        "embeds": [
+            {
+                "colour":      emb.colour.value if emb.colour else None,
+                "title":       emb.title,
+                "description": emb.description,
+                "fields":      [[fld.name, fld.value] for fld in emb.fields],
+            }
+            for emb in msg.embeds
+        ],
+        "attachments": [[att.filename, att.url] for att in msg.attachments],
+    }
+
+
+def _render_message(rec: dict) -> str:
+    """HTML for one message record, or "" for messages with nothing to show."""
+    if not rec["content"] and not rec["embeds"] and not rec["attachments"]:
+        return ""
+
+    created     = datetime.fromtimestamp(rec["created_at"], timezone.utc)
+    avatar_url  = rec["avatar"]
+    ts          = created.strftime("%H:%M")
+    date_str    = created.strftime("%Y-%m-%d")
+    is_bot      = rec["bot"]
+    name_color  = "#7289da" if is_bot else "#ffffff"
+    bg_color    = "#36393f" if is_bot else "#2f3136"
+
+    parts = []
+
+    if rec["content"]:
+        safe = (
+            rec["content"]
+            .replace("&", "&amp;")
+            .replace("<", "&lt;")
+            .replace(">", "&gt;")
+        )
+        safe = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', safe)
+        safe = re.sub(r'\*(.+?)\*',     r'<em>\1</em>',         safe)
+        safe = re.sub(r'`(.+?)`',       r'<code>\1</code>',     safe)
+        safe = safe.replace("\n", "<br>")
+        safe = re.sub(r'&lt;@!?(\d+)&gt;',    r'<span class="mention">@user</span>', safe)
+        safe = re.sub(r'&lt;@&amp;(\d+)&gt;', r'<span class="mention">@role</span>', safe)
+        parts.append(f'<div class="msg-content">{safe}</div>')
+
+    for emb in rec["embeds"]:
+        col = f"#{emb['colour']:06x}" if emb["colour"] else "#5865f2"
+        parts.append(f'<div class="embed" style="border-left:4px solid {col};">')
+        if emb["title"]:
+            parts.append(f'<div class="emb-title">{emb["title"]}</div>')
+        if emb["description"]:
+            d2 = (
+                emb["description"]
+                .replace("&","&amp;").replace("<","&lt;").replace(">","&gt;")
+            )
+            d2 = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', d2)
+            d2 = d2.replace("\n", "<br>")
+            parts.append(f'<div class="emb-desc">{d2}</div>')
+        for name, value in emb["fields"]:
+            fn = name.replace("<","&lt;").replace(">","&gt;")
+            fv = (
+                value
+                .replace("<","&lt;").replace(">","&gt;")
+            )
+            fv = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', fv)
+            fv = fv.replace("\n","<br>")
+            parts.append(f'<div class="emb-field"><span class="fn">{fn}</span><span class="fv">{fv}</span></div>')
+        parts.append('</div>')
+
+    for filename, url in rec["attachments"]:
+        if filename.lower().endswith(IMAGE_EXTS):
+            parts.append(f'<img src="{url}" style="max-width:400px;max-height:300px;border-radius:4px;margin-top:4px;display:block;">')
+        else:
+            parts.append(f'<div>📎 <a href="{url}" style="color:#00aff4;">{filename}</a></div>')
+
+    content_html = "".join(parts)
+    bot_badge    = "<span class='bot-tag'>BOT</span>" if is_bot else ""
+    return f"""
+<div class="msg-group" style="background:{bg_color}">
+  <img class="avatar" src="{avatar_url}" onerror="this.src='https://cdn.discordapp.com/embed/avatars/0.png'" alt="">
+  <div class="msg-body">
+    <div class="msg-header">
+      <span class="author" style="color:{name_color}">{rec["author"]}</span>
+      {bot_badge}
+      <span class="ts" title="{date_str}">{ts}</span>
+    </div>
+    {content_html}
+  </div>
+</div>"""
+
+
+# Shared stylesheet — identical for every transcript, so archived bodies
+# don't carry their own copy (see build_html).
+TRANSCRIPT_CSS = """*{box-sizing:border-box;margin:0;padding:0}
+body{background:#1e1f22;color:#dcddde;font-family:'Segoe UI',Arial,sans-serif;font-size:14px}
+.header{background:#2b2d31;padding:20px 28px;border-bottom:2px solid #111214}
+.header h1{font-size:20px;font-weight:700;color:#fff}
+.header p{font-size:12px;color:#949ba4;margin-top:3px}
+.info-grid{display:grid;grid-template-columns:repeat(auto-fit,minmax(170px,1fr));gap:10px;background:#2b2d31;margin:14px 18px;padding:14px;border-radius:8px;border-left:4px solid #5865f2}
+.info-item{display:flex;flex-direction:column;gap:2px}
+.lbl{font-size:10px;font-weight:700;color:#949ba4;text-transform:uppercase;letter-spacing:.5px}
+.val{font-size:13px;color:#fff;font-weight:500}
+.status-badge{display:inline-block;padding:2px 10px;border-radius:10px;font-size:11px;font-weight:700;color:#000}
+.messages{padding:8px 18px}
+.msg-group{display:flex;gap:12px;padding:7px 10px;border-radius:6px;margin-bottom:1px}
+.msg-group:hover{background:#35373c!important}
+.avatar{width:38px;height:38px;border-radius:50%;flex-shrink:0;object-fit:cover}
+.msg-body{flex:1;min-width:0}
+.msg-header{display:flex;align-items:center;gap:7px;margin-bottom:2px}
+.author{font-weight:600;font-size:14px}
+.bot-tag{background:#5865f2;color:#fff;font-size:9px;font-weight:700;padding:1px 5px;border-radius:3px;text-transform:uppercase}
+.ts{font-size:11px;color:#72767d}
+.msg-content{color:#dcddde;line-height:1.5;word-break:break-word}
+.mention{background:rgba(88,101,242,.3);color:#c9cdfb;border-radius:3px;padding:0 2px}
+code{background:#2b2d31;padding:1px 5px;border-radius:3px;font-family:monospace;font-size:13px;color:#f2f3f5}
+.embed{background:#2b2d31;border-radius:4px;padding:10px 14px;margin-top:5px;max-width:520px}
+.emb-title{font-weight:700;font-size:14px;color:#fff;margin-bottom:5px}
+.emb-desc{color:#dcddde;line-height:1.5;font-size:13px;margin-bottom:4px}
+.emb-field{margin-top:5px}
+.fn{display:block;font-weight:700;font-size:12px;color:#fff;margin-bottom:1px}
+.fv{display:block;font-size:12px;color:#dcddde;line-height:1.4}
+.footer{text-align:center;padding:18px;color:#72767d;font-size:11px;border-top:1px solid #35373c;margin-top:16px}
+"""
+
+
+def build_html(channel_name: str, body: str) -> str:
+    """Wrap a transcript body in the full standalone HTML document."""
+    return (
+        '<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="UTF-8">\n'
+        f"<title>Transcript — {channel_name}</title>\n<style>\n{TRANSCRIPT_CSS}</style>\n</head>\n"
+        f"<body>\n{body}\n</body>\n</html>"
+    )
+
+
+def _body_head(channel_name: str, ticket_data: dict, closed_at: str) -> str:
+    """Body markup up to and including the opening messages container."""
     send_method  = ticket_data.get("send_method", "?")
     recv_method  = ticket_data.get("receive_method", "?")
     send_detail  = ticket_data.get("send_detail") or ""
@@ -27,7 +172,6 @@ async def create_transcript(channel: discord.TextChannel, ticket_data: dict) ->
     user_id      = ticket_data.get("user_id", "?")
     created_ts   = ticket_data.get("created_at", 0)
     created_at   = datetime.utcfromtimestamp(created_ts).strftime("%Y-%m-%d %H:%M UTC")
-    closed_at    = datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC")
 
     send_str = send_method + (f" ({send_detail})" if send_detail else "")
     recv_str = recv_method + (f" ({recv_detail})"  if recv_detail  else "")
@@ -38,131 +182,17 @@ async def create_transcript(channel: discord.TextChannel, ticket_data: dict) ->
         "#fee75c"
     )
 
-    # ── Build message HTML ────────────────────────────────────────
-    html_messages = ""
-    for msg in messages:
-        if not msg.content and not msg.embeds and not msg.attachments:
-            continue
-
-        avatar_url  = str(msg.author.display_avatar.url) if msg.author.display_avatar else ""
-        ts          = msg.created_at.strftime("%H:%M")
-        date_str    = msg.created_at.strftime("%Y-%m-%d")
-        is_bot      = msg.author.bot
-        name_color  = "#7289da" if is_bot else "#ffffff"
-        bg_color    = "#36393f" if is_bot else "#2f3136"
-
-        content_html = ""
-
-        if msg.content:
-            safe = (
-                msg.content
-                .replace("&", "&amp;")
-                .replace("<", "&lt;")
-                .replace(">", "&gt;")
-            )
-            safe = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', safe)
-            safe = re.sub(r'\*(.+?)\*',     r'<em>\1</em>',         safe)
-            safe = re.sub(r'`(.+?)`',       r'<code>\1</code>',     safe)
-            safe = safe.replace("\n", "<br>")
-            safe = re.sub(r'&lt;@!?(\d+)&gt;',    r'<span class="mention">@user</span>', safe)
-            safe = re.sub(r'&lt;@&amp;(\d+)&gt;', r'<span class="mention">@role</span>', safe)
-            content_html += f'<div class="msg-content">{safe}</div>'
-
-        for emb in msg.embeds:
-            col = f"#{emb.colour.value:06x}" if emb.colour and emb.colour.value else "#5865f2"
-            eh  = f'<div class="embed" style="border-left:4px solid {col};">'
-            if emb.title:
-                eh += f'<div class="emb-title">{emb.title}</div>'
-            if emb.description:
-                d2 = (
-                    emb.description
-                    .replace("&","&amp;").replace("<","&lt;").replace(">","&gt;")
-                )
-                d2 = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', d2)
-                d2 = d2.replace("\n", "<br>")
-                eh += f'<div class="emb-desc">{d2}</div>'
-            for fld in emb.fields:
-                fn = fld.name.replace("<","&lt;").replace(">","&gt;")
-                fv = (
-                    fld.value
-                    .replace("<","&lt;").replace(">","&gt;")
-                )
-                fv = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', fv)
-                fv = fv.replace("\n","<br>")
-                eh += f'<div class="emb-field"><span class="fn">{fn}</span><span class="fv">{fv}</span></div>'
-            eh += '</div>'
-            content_html += eh
-
-        for att in msg.attachments:
-            if any(att.filename.lower().endswith(e) for e in ['.png','.jpg','.jpeg','.gif','.webp']):
-                content_html += f'<img src="{att.url}" style="max-width:400px;max-height:300px;border-radius:4px;margin-top:4px;display:block;">'
-            else:
-                content_html += f'<div>📎 <a href="{att.url}" style="color:#00aff4;">{att.filename}</a></div>'
-
-        bot_badge = "<span class='bot-tag'>BOT</span>" if is_bot else ""
-        html_messages += f"""
-<div class="msg-group" style="background:{bg_color}">
-  <img class="avatar" src="{avatar_url}" onerror="this.src='https://cdn.discordapp.com/embed/avatars/0.png'" alt="">
-  <div class="msg-body">
-    <div class="msg-header">
-      <span class="author" style="color:{name_color}">{msg.author.display_name}</span>
-      {bot_badge}
-      <span class="ts" title="{date_str}">{ts}</span>
-    </div>
-    {content_html}
-  </div>
-</div>"""
-
     # ── Conditional info rows ─────────────────────────────────────
     amount_row  = f'<div class="info-item"><span class="lbl">Amount Sent</span><span class="val">€{amount:.2f}</span></div>' if amount else ""
     fee_row     = f'<div class="info-item"><span class="lbl">Fee ({percent}%)</span><span class="val">€{fee:.2f}</span></div>' if fee is not None else ""
     recv_row    = f'<div class="info-item"><span class="lbl">Amount Received</span><span class="val">€{recv_amount:.2f}</span></div>' if recv_amount is not None else ""
-    no_msg      = '<p style="color:#72767d;text-align:center;padding:30px">No messages found.</p>' if not html_messages else html_messages
-
-    html = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-<meta charset="UTF-8">
-<title>Transcript — {channel.name}</title>
-<style>
-*{{box-sizing:border-box;margin:0;padding:0}}
-body{{background:#1e1f22;color:#dcddde;font-family:'Segoe UI',Arial,sans-serif;font-size:14px}}
-.header{{background:#2b2d31;padding:20px 28px;border-bottom:2px solid #111214}}
-.header h1{{font-size:20px;font-weight:700;color:#fff}}
-.header p{{font-size:12px;color:#949ba4;margin-top:3px}}
-.info-grid{{display:grid;grid-template-columns:repeat(auto-fit,minmax(170px,1fr));gap:10px;background:#2b2d31;margin:14px 18px;padding:14px;border-radius:8px;border-left:4px solid #5865f2}}
-.info-item{{display:flex;flex-direction:column;gap:2px}}
-.lbl{{font-size:10px;font-weight:700;color:#949ba4;text-transform:uppercase;letter-spacing:.5px}}
-.val{{font-size:13px;color:#fff;font-weight:500}}
-.status-badge{{display:inline-block;padding:2px 10px;border-radius:10px;font-size:11px;font-weight:700;background:{status_color};color:#000}}
-.messages{{padding:8px 18px}}
-.msg-group{{display:flex;gap:12px;padding:7px 10px;border-radius:6px;margin-bottom:1px}}
-.msg-group:hover{{background:#35373c!important}}
-.avatar{{width:38px;height:38px;border-radius:50%;flex-shrink:0;object-fit:cover}}
-.msg-body{{flex:1;min-width:0}}
-.msg-header{{display:flex;align-items:center;gap:7px;margin-bottom:2px}}
-.author{{font-weight:600;font-size:14px}}
-.bot-tag{{background:#5865f2;color:#fff;font-size:9px;font-weight:700;padding:1px 5px;border-radius:3px;text-transform:uppercase}}
-.ts{{font-size:11px;color:#72767d}}
-.msg-content{{color:#dcddde;line-height:1.5;word-break:break-word}}
-.mention{{background:rgba(88,101,242,.3);color:#c9cdfb;border-radius:3px;padding:0 2px}}
-code{{background:#2b2d31;padding:1px 5px;border-radius:3px;font-family:monospace;font-size:13px;color:#f2f3f5}}
-.embed{{background:#2b2d31;border-radius:4px;padding:10px 14px;margin-top:5px;max-width:520px}}
-.emb-title{{font-weight:700;font-size:14px;color:#fff;margin-bottom:5px}}
-.emb-desc{{color:#dcddde;line-height:1.5;font-size:13px;margin-bottom:4px}}
-.emb-field{{margin-top:5px}}
-.fn{{display:block;font-weight:700;font-size:12px;color:#fff;margin-bottom:1px}}
-.fv{{display:block;font-size:12px;color:#dcddde;line-height:1.4}}
-.footer{{text-align:center;padding:18px;color:#72767d;font-size:11px;border-top:1px solid #35373c;margin-top:16px}}
-</style>
-</head>
-<body>
-<div class="header">
+
+    return f"""<div class="header">
   <h1>💱 Exchora — Ticket Transcript</h1>
-  <p>#{channel.name} &nbsp;·&nbsp; Exported {closed_at}</p>
+  <p>#{channel_name} &nbsp;·&nbsp; Exported {closed_at}</p>
 </div>
 <div class="info-grid">
-  <div class="info-item"><span class="lbl">Status</span><span class="val"><span class="status-badge">{status}</span></span></div>
+  <div class="info-item"><span class="lbl">Status</span><span class="val"><span class="status-badge" style="background:{status_color}">{status}</span></span></div>
   <div class="info-item"><span class="lbl">User ID</span><span class="val">{user_id}</span></div>
   <div class="info-item"><span class="lbl">Sending</span><span class="val">{send_str}</span></div>
   <div class="info-item"><span class="lbl">Receiving</span><span class="val">{recv_str}</span></div>
@@ -170,10 +200,180 @@ code{{background:#2b2d31;padding:1px 5px;border-radius:3px;font-family:monospace
   <div class="info-item"><span class="lbl">Opened</span><span class="val">{created_at}</span></div>
   <div class="info-item"><span class="lbl">Closed</span><span class="val">{closed_at}</span></div>
 </div>
-<div class="messages">{no_msg}</div>
-<div class="footer">Exchora Exchange System &nbsp;·&nbsp; .gg/Exchora &nbsp;·&nbsp; {closed_at}</div>
-</body>
-</html>"""
+<div class="messages">"""
+
+
+def _body_tail(closed_at: str) -> str:
+    return f"""</div>
+<div class="footer">Exchora Exchange System &nbsp;·&nbsp; .gg/Exchora &nbsp;·&nbsp; {closed_at}</div>"""
+
+
+NO_MESSAGES = '<p style="color:#72767d;text-align:center;padding:30px">No messages found.</p>'
+
+
+# ── Off-loop rendering ───────────────────────────────────────────
+# transcript-render-mode: "inline" (on the event loop), "thread" or "process"
+# (default). Worker pools are created on first use and shared by all closes.
+
+_pool: Optional[Executor] = None
+
+
+def _render_batch(records: list) -> tuple[str, list[list[str]]]:
+    """Render a batch of records.
+
+    Returns the HTML and, for each visible message in order, its search
+    tokens (tokenizing here keeps that work off the event loop too).
+    """
+    chunks, tokens = [], []
+    for rec in records:
+        html = _render_message(rec)
+        if html:
+            chunks.append(html)
+            tokens.append(sorted(transcript_search.record_tokens(rec)))
+    return "".join(chunks), tokens
+
+
+def _get_pool(mode: str) -> Optional[Executor]:
+    global _pool
+    if mode == "inline":
+        return None
+    if _pool is None:
+        workers = max(1, int(get_config().get("transcript-render-workers", 2)))
+        if mode == "thread":
+            _pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="transcript")
+        else:
+            _pool = ProcessPoolExecutor(max_workers=workers)
+    return _pool
+
+
+def _submit(pool: Optional[Executor], records: list) -> asyncio.Future:
+    loop = asyncio.get_running_loop()
+    if pool is None:
+        fut = loop.create_future()
+        fut.set_result(_render_batch(records))
+        return fut
+    return loop.run_in_executor(pool, _render_batch, records)
+
+
+def _bound(message_id: Optional[int]) -> Optional[discord.Object]:
+    return discord.Object(id=message_id) if message_id else None
+
+
+async def _iter_records(channel: discord.TextChannel, limit: Optional[int]):
+    """Yield message records oldest-first.
+
+    Uses the ticket's live capture log when there is one and only asks the
+    API for history inside the gaps it marks; tickets without a log fall
+    back to reading the whole channel history.
+    """
+    if not capture.is_active(channel.id):
+        async for msg in channel.history(limit=limit, oldest_first=True):
+            yield snapshot_message(msg)
+        return
+
+    info    = await run_io(capture.scan, channel.id)
+    entries = capture.iter_log(channel.id)
+    gap_no  = 0
+    while True:
+        chunk = await run_io(lambda: list(itertools.islice(entries, 500)))
+        if not chunk:
+            break
+        for entry in chunk:
+            if entry["op"] == "msg":
+                mid = entry["rec"]["id"]
+                if mid not in info["deleted"]:
+                    yield info["edits"].get(mid, entry["rec"])
+            elif entry["op"] == "gap":
+                gap = info["gaps"][gap_no]
+                gap_no += 1
+                if gap is None:
+                    continue
+                after, before = gap
+                async for msg in channel.history(limit=limit, oldest_first=True,
+                                                 after=_bound(after), before=_bound(before)):
+                    yield snapshot_message(msg)
+
+
+async def create_transcript(channel: discord.TextChannel, ticket_data: dict,
+                            closed_ts: Optional[float] = None) -> dict:
+    """Stream the ticket's messages into a compressed archive transcript.
+
+    Messages come from the live capture log (or channel history), and are
+    rendered in batches on the render pool while the next batch is being
+    read; each rendered batch is compressed straight into the archive, so
+    memory stays flat however long the ticket is. `transcript-message-limit`
+    caps the number of messages read per history fetch (unset/0 = no cap).
+
+    `closed_ts` (default now) also keys the archive entry, so re-running a
+    close with the same timestamp replaces its transcript instead of adding
+    a second one.
+
+    Returns the archive manifest entry; use transcript_archive.load_html()
+    to get the full HTML document.
+    """
+    cfg        = get_config()
+    limit      = cfg.get("transcript-message-limit") or None
+    batch_size = max(1, int(cfg.get("transcript-render-batch", 200)))
+    pool       = _get_pool(str(cfg.get("transcript-render-mode", "process")).lower())
+
+    closed_ts = closed_ts or time.time()
+    closed_at = datetime.utcfromtimestamp(closed_ts).strftime("%Y-%m-%d %H:%M UTC")
+    key       = f"{channel.id}-{int(closed_ts * 1000)}"
+    codec     = transcript_archive.codec()
+
+    f = await asyncio.to_thread(transcript_archive.open_writer, key, codec)
+    try:
+        await asyncio.to_thread(f.write, _body_head(channel.name, ticket_data, closed_at))
+        written  = 0
+        pending  = None
+        batch    = []
+        postings: dict[str, list[int]] = {}
+
+        async def drain():
+            nonlocal written
+            html, tokens = await pending
+            await asyncio.to_thread(f.write, html)
+            for msg_tokens in tokens:
+                for token in msg_tokens:
+                    postings.setdefault(token, []).append(written)
+                written += 1
+
+        async for rec in _iter_records(channel, limit):
+            batch.append(rec)
+            if len(batch) >= batch_size:
+                if pending is not None:
+                    await drain()
+                pending, batch = _submit(pool, batch), []
+        if pending is not None:
+            await drain()
+        if batch:
+            pending = _submit(pool, batch)
+            await drain()
+
+        if not written:
+            await asyncio.to_thread(f.write, NO_MESSAGES)
+        await asyncio.to_thread(f.write, _body_tail(closed_at))
+    finally:
+        await asyncio.to_thread(f.close)
 
-    filepath.write_text(html, encoding="utf-8")
-    return filepath
+    entry = {
+        "key":            key,
+        "codec":          codec,
+        "filename":       f"transcript-{channel.name}-{channel.id}.html",
+        "channel_id":     channel.id,
+        "channel_name":   channel.name,
+        "user_id":        int(ticket_data.get("user_id") or 0),
+        "claimed_by":     ticket_data.get("claimed_by"),
+        "status":         ticket_data.get("status", "unknown"),
+        "send_method":    ticket_data.get("send_method"),
+        "send_detail":    ticket_data.get("send_detail"),
+        "receive_method": ticket_data.get("receive_method"),
+        "receive_detail": ticket_data.get("receive_detail"),
+        "amount":         ticket_data.get("amount"),
+        "created_at":     ticket_data.get("created_at", 0),
+        "closed_at":      closed_ts,
+        "messages":       written,
+    }
+    entry = await run_io(transcript_archive.add, entry)
+    await run_io(transcript_search.add_document, key, postings)
+    return entry
@@ -0,0 +1,192 @@
+import bisect
+import gzip
+import json
+import lzma
+import os
+import time
+from pathlib import Path
+from typing import IO, Optional
+
+from utils.config_loader import get_config
+
+# Compressed transcript archive. Each closed ticket stores only its <body>
+# markup, gzip/lzma-compressed, under transcripts/archive/. The shared <head>
+# (CSS) lives once in utils.transcript and is re-attached by load_html() when
+# a transcript is uploaded. manifest.json lists every stored transcript and
+# is indexed in memory by channel, user, status and close time.
+
+ARCHIVE_DIR   = Path(__file__).parent.parent / "transcripts" / "archive"
+MANIFEST_PATH = ARCHIVE_DIR / "manifest.json"
+
+_CODECS = {
+    "gzip": (".html.gz", lambda p, mode: gzip.open(p, mode, compresslevel=6, encoding="utf-8")),
+    "lzma": (".html.xz", lambda p, mode: lzma.open(p, mode, encoding="utf-8")),
+}
+
+_entries: Optional[dict[str, dict]] = None
+_by_channel: dict[int, list[str]] = {}
+_by_user: dict[int, list[str]] = {}
+_by_status: dict[str, list[str]] = {}
+_by_time: list[tuple[float, str]] = []
+
+
+# ── Manifest ──────────────────────────────────────────────────
+
+def _index(entry: dict):
+    key = entry["key"]
+    _by_channel.setdefault(int(entry["channel_id"]), []).append(key)
+    _by_user.setdefault(int(entry["user_id"]), []).append(key)
+    _by_status.setdefault(entry["status"], []).append(key)
+    bisect.insort(_by_time, (entry["closed_at"], key))
+
+
+def _unindex(entry: dict):
+    key = entry["key"]
+    for index, k in ((_by_channel, int(entry["channel_id"])), (_by_user, int(entry["user_id"])),
+                     (_by_status, entry["status"])):
+        keys = index.get(k, [])
+        if key in keys:
+            keys.remove(key)
+        if not keys:
+            index.pop(k, None)
+    pos = bisect.bisect_left(_by_time, (entry["closed_at"], key))
+    if pos < len(_by_time) and _by_time[pos][1] == key:
+        del _by_time[pos]
+
+
+def _load() -> dict[str, dict]:
+    global _entries
+    if _entries is None:
+        _entries = {}
+        if MANIFEST_PATH.exists():
+            with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+                _entries = json.load(f)
+        for entry in _entries.values():
+            _index(entry)
+    return _entries
+
+
+def _save():
+    tmp = MANIFEST_PATH.with_suffix(".json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(_load(), f, ensure_ascii=False)
+    os.replace(tmp, MANIFEST_PATH)
+
+
+# ── Writing ───────────────────────────────────────────────────
+
+def codec() -> str:
+    name = str(get_config().get("transcript-compression", "gzip")).lower()
+    return name if name in _CODECS else "gzip"
+
+
+def open_writer(key: str, codec_name: str) -> IO[str]:
+    """Text-mode compressed file for a transcript body."""
+    ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+    suffix, opener = _CODECS[codec_name]
+    return opener(ARCHIVE_DIR / f"{key}{suffix}", "wt")
+
+
+def add(entry: dict) -> dict:
+    """Register a finished body in the manifest, then apply retention."""
+    suffix = _CODECS[entry["codec"]][0]
+    entry["file"] = f"{entry['key']}{suffix}"
+    entry["size"] = (ARCHIVE_DIR / entry["file"]).stat().st_size
+    entries = _load()
+    old = entries.get(entry["key"])
+    if old:
+        _unindex(old)
+        if old["file"] != entry["file"]:
+            (ARCHIVE_DIR / old["file"]).unlink(missing_ok=True)
+    entries[entry["key"]] = entry
+    _index(entry)
+    prune()
+    _save()
+    return entry
+
+
+def update(key: str, **fields):
+    """Store extra fields (e.g. where the transcript was uploaded) on an entry."""
+    entry = _load().get(key)
+    if entry:
+        entry.update(fields)
+        _save()
+
+
+def _remove(key: str):
+    entry = _load().pop(key, None)
+    if entry:
+        _unindex(entry)
+        (ARCHIVE_DIR / entry["file"]).unlink(missing_ok=True)
+
+
+def prune() -> int:
+    """Drop transcripts past transcript-retention-days, then the oldest ones
+    until the archive fits in transcript-retention-max-mb. Returns the count."""
+    cfg     = get_config()
+    days    = cfg.get("transcript-retention-days")
+    max_mb  = cfg.get("transcript-retention-max-mb")
+    entries = _load()
+    removed = 0
+
+    if days:
+        cutoff = time.time() - float(days) * 86400
+        while _by_time and _by_time[0][0] < cutoff:
+            _remove(_by_time[0][1])
+            removed += 1
+
+    if max_mb:
+        budget = float(max_mb) * 1024 * 1024
+        total  = sum(e["size"] for e in entries.values())
+        while _by_time and total > budget:
+            total -= entries[_by_time[0][1]]["size"]
+            _remove(_by_time[0][1])
+            removed += 1
+    return removed
+
+
+# ── Reading ───────────────────────────────────────────────────
+
+def get(key: str) -> Optional[dict]:
+    return _load().get(key)
+
+
+def find(channel_id: Optional[int] = None, user_id: Optional[int] = None, status: Optional[str] = None,
+         since: Optional[float] = None, until: Optional[float] = None) -> list[dict]:
+    """Manifest entries matching every given filter, newest first."""
+    entries = _load()
+
+    # Start from the smallest matching index bucket, then filter the rest
+    keys = None
+    for index, value in ((_by_channel, channel_id), (_by_user, user_id), (_by_status, status)):
+        if value is not None:
+            bucket = index.get(value, [])
+            if keys is None or len(bucket) < len(keys):
+                keys = bucket
+    if keys is None:
+        lo   = bisect.bisect_left(_by_time, (since, "")) if since is not None else 0
+        hi   = bisect.bisect_right(_by_time, (until, "\uffff")) if until is not None else len(_by_time)
+        keys = [k for _, k in _by_time[lo:hi]]
+
+    result = [
+        e for e in map(entries.__getitem__, keys)
+        if (channel_id is None or int(e["channel_id"]) == channel_id)
+        and (user_id is None or int(e["user_id"]) == user_id)
+        and (status is None or e["status"] == status)
+        and (since is None or e["closed_at"] >= since)
+        and (until is None or e["closed_at"] <= until)
+    ]
+    result.sort(key=lambda e: e["closed_at"], reverse=True)
+    return result
+
+
+def load_body(entry: dict) -> str:
+    _, opener = _CODECS[entry["codec"]]
+    with opener(ARCHIVE_DIR / entry["file"], "rt") as f:
+        return f.read()
+
+
+def load_html(entry: dict) -> bytes:
+    """Full standalone HTML document for an archived transcript."""
+    from utils.transcript import build_html
+    return build_html(entry["channel_name"], load_body(entry)).encode("utf-8")
@@ -0,0 +1,193 @@
+import asyncio
+import gzip
+import io
+import json
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+import discord
+
+from utils import scheduler, transcript_archive
+from utils.async_database import run_io
+from utils.config_loader import get_config
+
+# Transcript delivery. A closed ticket's transcript is uploaded to the
+# exchange-logs channel; the message ID and attachment URL are stored on its
+# archive manifest entry, so /transcript-get links to that attachment instead
+# of uploading the file again. The user's DM always carries the file itself:
+# CDN links expire after about a day and users cannot use /transcript-get.
+# Transcripts over transcript-upload-compress-mb are uploaded gzipped. A
+# delivery that fails goes into data/delivery_queue.json and is retried with
+# exponential backoff.
+
+QUEUE_PATH = Path(__file__).parent.parent / "data" / "delivery_queue.json"
+
+MAX_ATTEMPTS = 8
+
+_queue: Optional[list[dict]] = None
+
+
+# ── Retry queue ───────────────────────────────────────────────
+
+def _load() -> list[dict]:
+    global _queue
+    if _queue is None:
+        _queue = []
+        if QUEUE_PATH.exists():
+            with open(QUEUE_PATH, "r", encoding="utf-8") as f:
+                _queue = json.load(f)
+    return _queue
+
+
+def _save():
+    QUEUE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = QUEUE_PATH.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(_load(), f)
+    os.replace(tmp, QUEUE_PATH)
+
+
+def _enqueue(kind: str, key: str, error: str):
+    item_id = f"{kind}:{key}"
+    if not any(item["id"] == item_id for item in _load()):
+        _load().append({"id": item_id, "kind": kind, "key": key, "attempts": 1,
+                        "next_at": time.time() + 60, "error": error})
+        _save()
+
+
+def _due() -> list[dict]:
+    now = time.time()
+    return [dict(item) for item in _load() if item["next_at"] <= now]
+
+
+def _resolve(item_id: str, error: Optional[str] = None) -> bool:
+    """Drop a delivered item, or push a failed one back with a doubled delay.
+    Returns False once the item has used up its attempts."""
+    for i, item in enumerate(_load()):
+        if item["id"] == item_id:
+            break
+    else:
+        return False
+    if error is None or item["attempts"] >= MAX_ATTEMPTS:
+        del _queue[i]
+        _save()
+        return error is None
+    item["attempts"] += 1
+    item["error"]     = error
+    item["next_at"]   = time.time() + min(60 * 2 ** item["attempts"], 6 * 3600)
+    _save()
+    return True
+
+
+def pending() -> list[dict]:
+    return [dict(item) for item in _load()]
+
+
+# ── Delivery ──────────────────────────────────────────────────
+
+def upload_file(entry: dict) -> discord.File:
+    """The transcript as an upload, gzipped when it is large."""
+    html  = transcript_archive.load_html(entry)
+    limit = float(get_config().get("transcript-upload-compress-mb", 8)) * 1024 * 1024
+    if len(html) > limit:
+        return discord.File(io.BytesIO(gzip.compress(html, 9)), filename=entry["filename"] + ".gz")
+    return discord.File(io.BytesIO(html), filename=entry["filename"])
+
+
+def _embed(entry: dict, title: str, description: str) -> discord.Embed:
+    emb = discord.Embed(
+        title=title,
+        description=description,
+        color=discord.Color.green() if entry["status"] == "completed" else discord.Color.red(),
+        timestamp=discord.utils.utcnow(),
+    )
+    emb.set_footer(text="Exchora Exchange • .gg/Exchora")
+    return emb
+
+
+async def attachment_url(bot: discord.Client, entry: dict) -> Optional[str]:
+    """A fresh URL for the stored upload (Discord CDN links expire), or None."""
+    if not entry.get("log_message_id"):
+        return None
+    log_ch = bot.get_channel(int(entry["log_channel_id"]))
+    if not log_ch:
+        return entry.get("attachment_url")
+    try:
+        msg = await scheduler.run(lambda: log_ch.fetch_message(int(entry["log_message_id"])),
+                                  f"messages:{log_ch.id}")
+    except discord.NotFound:
+        return None
+    return msg.attachments[0].url if msg.attachments else None
+
+
+async def _deliver_log(bot: discord.Client, entry: dict):
+    if entry.get("log_message_id"):
+        return  # already uploaded
+    log_ch_id = get_config().get("exchange-logs-channel-id")
+    log_ch    = bot.get_channel(int(log_ch_id)) if log_ch_id else None
+    if not log_ch:
+        return
+    emb = _embed(entry, f"📋 Transcript — #{entry['channel_name']}", f"**Status:** {entry['status'].capitalize()}")
+
+    async def send():
+        return await log_ch.send(embed=emb, file=await asyncio.to_thread(upload_file, entry))
+
+    msg = await scheduler.run(send, f"messages:{log_ch.id}", scheduler.PRIORITY_NORMAL)
+    fields = {"log_channel_id": log_ch.id, "log_message_id": msg.id, "attachment_url": msg.attachments[0].url}
+    entry.update(fields)
+    await run_io(transcript_archive.update, entry["key"], **fields)
+
+
+async def _deliver_dm(bot: discord.Client, entry: dict):
+    uid = entry.get("user_id")
+    if not uid:
+        return
+    try:
+        user = bot.get_user(int(uid)) or await bot.fetch_user(int(uid))
+    except discord.NotFound:
+        return
+    emb = _embed(entry, "📋 Your Exchange Ticket Transcript",
+                 f"Your ticket **#{entry['channel_name']}** has been closed.\n"
+                 f"**Status:** {entry['status'].capitalize()}\n\n"
+                 "The full transcript is attached.")
+
+    async def factory():
+        return await user.send(embed=emb, file=await asyncio.to_thread(upload_file, entry))
+    try:
+        await scheduler.run(factory, f"dm:{uid}", scheduler.PRIORITY_USER)
+    except discord.Forbidden:
+        pass  # DMs closed — retrying will not help
+
+
+_DELIVER = {"log": _deliver_log, "dm": _deliver_dm}
+
+
+async def deliver(bot: discord.Client, entry: dict):
+    """Deliver a freshly archived transcript: log upload first, then the DM
+    with its own copy. Failures go to the retry queue."""
+    entry = dict(entry)
+    for kind in ("log", "dm"):
+        try:
+            await _DELIVER[kind](bot, entry)
+        except Exception as e:
+            print(f"[Transcript Error] {kind} delivery of {entry['key']} failed, will retry: {e}")
+            await run_io(_enqueue, kind, entry["key"], str(e))
+
+
+async def retry_loop(bot: discord.Client):
+    """Background task: re-attempt queued deliveries once they are due."""
+    await bot.wait_until_ready()
+    while True:
+        for item in await run_io(_due):
+            entry = await run_io(transcript_archive.get, item["key"])
+            error = None
+            if entry:  # else pruned by retention meanwhile
+                try:
+                    await _DELIVER[item["kind"]](bot, dict(entry))
+                except Exception as e:
+                    error = str(e)
+            if not await run_io(_resolve, item["id"], error) and error:
+                print(f"[Transcript Error] giving up on {item['id']}: {error}")
+        await asyncio.sleep(30)
@@ -0,0 +1,148 @@
+import json
+import os
+import re
+from typing import Optional
+
+from utils import transcript_archive
+
+# Inverted index over archived transcripts: token → {transcript key → [message
+# numbers]}. Each finished transcript appends one line to postings.jsonl, so
+# indexing is incremental; the file is compacted once enough of its documents
+# have been removed from the archive by retention.
+
+INDEX_PATH = transcript_archive.ARCHIVE_DIR / "search" / "postings.jsonl"
+
+_TOKEN_RE  = re.compile(r"\w{2,64}")
+
+_index: Optional[dict[str, dict[str, list[int]]]] = None
+_docs: dict[str, tuple[str, ...]] = {}   # transcript key → its tokens
+
+
+def tokenize(text: str) -> set[str]:
+    return set(_TOKEN_RE.findall(text.lower()))
+
+
+def record_tokens(rec: dict) -> set[str]:
+    """Searchable tokens of one message record (author, content, embeds, files)."""
+    parts = [rec["author"], rec["content"] or ""]
+    for emb in rec["embeds"]:
+        parts += [emb["title"] or "", emb["description"] or ""]
+        parts += [f"{name} {value}" for name, value in emb["fields"]]
+    parts += [filename for filename, _ in rec["attachments"]]
+    return tokenize(" ".join(parts))
+
+
+# ── Index maintenance ─────────────────────────────────────────
+
+def _merge(doc: str, postings: dict[str, list[int]]):
+    # A re-indexed transcript replaces its earlier postings
+    for token in _docs.pop(doc, ()):
+        docs = _index[token]
+        del docs[doc]
+        if not docs:
+            del _index[token]
+    for token, msgs in postings.items():
+        _index.setdefault(token, {})[doc] = msgs
+    _docs[doc] = tuple(postings)
+
+
+def _load() -> dict[str, dict[str, list[int]]]:
+    global _index
+    if _index is None:
+        _index = {}
+        if INDEX_PATH.exists():
+            with open(INDEX_PATH, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                    except json.JSONDecodeError:
+                        break  # torn final line
+                    _merge(row["doc"], row["postings"])
+    return _index
+
+
+def _compact():
+    """Rewrite postings.jsonl without documents that left the archive."""
+    live    = {d for d in _docs if transcript_archive.get(d)}
+    per_doc = {d: {} for d in live}
+    for token, docs in _load().items():
+        for doc in list(docs):
+            if doc in live:
+                per_doc[doc][token] = docs[doc]
+            else:
+                del docs[doc]
+    for token in [t for t, docs in _index.items() if not docs]:
+        del _index[token]
+    for doc in [d for d in _docs if d not in live]:
+        del _docs[doc]
+
+    tmp = INDEX_PATH.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        for doc, postings in per_doc.items():
+            f.write(json.dumps({"doc": doc, "postings": postings}) + "\n")
+    os.replace(tmp, INDEX_PATH)
+
+
+def add_document(doc: str, postings: dict[str, list[int]]):
+    """Index one transcript; `postings` maps token → message numbers."""
+    _load()
+    INDEX_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(INDEX_PATH, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"doc": doc, "postings": postings}) + "\n")
+    _merge(doc, postings)
+
+    dead = sum(1 for d in _docs if not transcript_archive.get(d))
+    if dead > 100 and dead * 4 > len(_docs):
+        _compact()
+
+
+# ── Queries ───────────────────────────────────────────────────
+
+def search(query: str, user_id: Optional[int] = None, status: Optional[str] = None,
+           method: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None,
+           limit: int = 10) -> tuple[int, list[tuple[dict, int]]]:
+    """Transcripts containing every query token, newest first.
+
+    Filters apply to the archived ticket data; `method` matches either the
+    send or the receive method. Returns (total hits, [(manifest entry,
+    matching message count)] for the first `limit`).
+    """
+    index  = _load()
+    tokens = tokenize(query)
+    if not tokens:
+        return 0, []
+
+    postings = sorted((index.get(t, {}) for t in tokens), key=len)
+    docs = set(postings[0])
+    for p in postings[1:]:
+        docs.intersection_update(p)
+        if not docs:
+            return 0, []
+
+    method = method.lower() if method else None
+    hits = []
+    for doc in docs:
+        entry = transcript_archive.get(doc)
+        if not entry:
+            continue
+        if user_id is not None and int(entry["user_id"]) != user_id:
+            continue
+        if status and entry["status"] != status:
+            continue
+        if method and method not in ((entry.get("send_method") or "").lower(),
+                                     (entry.get("receive_method") or "").lower()):
+            continue
+        if since is not None and entry["closed_at"] < since:
+            continue
+        if until is not None and entry["closed_at"] > until:
+            continue
+        hits.append(entry)
+
+    hits.sort(key=lambda e: e["closed_at"], reverse=True)
+    results = []
+    for entry in hits[:limit]:
+        msgs = set(postings[0][entry["key"]])
+        for p in postings[1:]:
+            msgs.intersection_update(p[entry["key"]])
+        results.append((entry, len(msgs)))
+    return len(hits), results